@@ -0,0 +1,247 @@
+"""Benchmark: the Haven client against a local mock of the Haven API.
+
+For each account size this measures the setup time (authenticate, discover,
+first refresh), the requests and time per poll cycle, the latency from a
+command to its state being visible after a refresh, and the peak memory
+allocated by the client. The mock runs in a separate process, so neither
+its CPU time nor its memory is counted.
+
+Run from the repository root:
+
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --latency 0.05 --error-rate 0.02
+    python benchmarks/bench_api.py --baseline benchmarks/results/<earlier>.json
+
+Results are written as JSON to benchmarks/results/ (or --output); with
+--baseline the run is compared against an earlier result and the exit status
+is 1 when a metric regressed by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import aiohttp
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "custom_components", "haven"))
+sys.path.insert(0, HERE)
+
+from havenlighting import CommandIntent, HavenClient, LightCommandQueue  # noqa: E402
+from havenlighting.config import RATE_LIMIT_PER_SECOND  # noqa: E402
+from mock_haven_api import GROUP_SIZE, serve  # noqa: E402
+
+SIZES = (10, 100, 1000)
+COMMAND_SAMPLES = 5
+POLL_CYCLES = 3
+# Metrics where a higher value is worse, compared against --baseline
+COMPARED = ("setup_s", "poll_requests", "poll_s", "command_latency_s", "peak_memory_mib")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_serving(base: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base}/stats"):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+
+
+async def _request_count(base: str, reset: bool = False) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base}/stats") as response:
+            count = sum((await response.json()).values())
+        if reset:
+            async with session.post(f"{base}/stats/reset"):
+                pass
+    return count
+
+
+async def _bench_size(base: str, lights: int, args: argparse.Namespace) -> dict:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    client = HavenClient(
+        log_level=logging.WARNING, rate_limit=args.rate_limit, api_base=f"{base}/api"
+    )
+    try:
+        await client.async_authenticate("bench@example.com", "secret")
+        locations = await client.async_discover_locations()
+        await client.async_refresh_locations(True)
+        setup = time.perf_counter() - start
+
+        await _request_count(base, reset=True)
+        poll_times = []
+        for _ in range(args.cycles):
+            start = time.perf_counter()
+            await client.async_refresh_locations(True)
+            poll_times.append(time.perf_counter() - start)
+        poll_requests = await _request_count(base, reset=True) / args.cycles
+
+        # The same path a HavenLight takes: optimistic state, debounce and
+        # group planner; the confirming refresh runs after the command returns
+        location = next(iter(locations.values()))
+        zones = [light for light in location.lights.values() if light._type != "Group"]
+        latencies = []
+        for sample in range(args.samples):
+            light = zones[sample % len(zones)]
+            intent = CommandIntent(on=not light.is_on)
+            queue = LightCommandQueue(light, dispatch=location.planner.async_dispatch)
+            start = time.perf_counter()
+            light.expect(intent)
+            await queue.async_submit(intent)
+            latencies.append(time.perf_counter() - start)
+            await client.async_refresh_location(location, True)
+
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        await client.async_close()
+        tracemalloc.stop()
+
+    return {
+        "lights": lights,
+        "setup_s": round(setup, 4),
+        "poll_requests": poll_requests,
+        "poll_s": round(statistics.median(poll_times), 4),
+        "command_latency_s": round(statistics.median(latencies), 4),
+        "command_latency_max_s": round(max(latencies), 4),
+        "peak_memory_mib": round(peak / 2**20, 2),
+    }
+
+
+def run_size(lights: int, args: argparse.Namespace) -> dict:
+    """Start a mock account of ``lights`` zones and groups and benchmark it."""
+    groups = max(1, lights // GROUP_SIZE)
+    port = _free_port()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(port,),
+        kwargs={
+            "zones": lights - groups,
+            "groups": groups,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+        },
+        daemon=True,
+    )
+    server.start()
+    base = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_until_serving(base))
+        return asyncio.run(_bench_size(base, lights, args))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change of each metric; return True if any regressed."""
+    regressed = False
+    previous = {row["lights"]: row for row in baseline["results"]}
+    for row in results["results"]:
+        old = previous.get(row["lights"])
+        if old is None:
+            continue
+        for metric in COMPARED:
+            if not old.get(metric):
+                continue
+            change = row[metric] / old[metric] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{row['lights']:>6} lights  {metric:<20} {old[metric]:>10} -> {row[metric]:>10} ({change:+.1%}){flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="lights per account")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock latency per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 503")
+    parser.add_argument(
+        "--rate-limit", type=float, default=RATE_LIMIT_PER_SECOND,
+        help="client requests per second; raise it to time the code rather than the throttle",
+    )
+    parser.add_argument("--samples", type=int, default=COMMAND_SAMPLES, help="commands timed per size")
+    parser.add_argument("--cycles", type=int, default=POLL_CYCLES, help="poll cycles timed per size")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "samples": args.samples,
+            "cycles": args.cycles,
+        },
+        "results": [],
+    }
+    print(f"{'lights':>6} {'setup s':>9} {'req/poll':>9} {'poll s':>8} {'cmd s':>8} {'peak MiB':>9}")
+    for lights in args.sizes:
+        row = run_size(lights, args)
+        results["results"].append(row)
+        print(
+            f"{row['lights']:>6} {row['setup_s']:>9.3f} {row['poll_requests']:>9.1f} "
+            f"{row['poll_s']:>8.3f} {row['command_latency_s']:>8.3f} {row['peak_memory_mib']:>9.2f}"
+        )
+
+    output = args.output or os.path.join(
+        HERE, "results", time.strftime("bench_api-%Y%m%d-%H%M%S.json")
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Micro-benchmark: Haven color matching, LUT-backed CIEDE2000 vs the old RGB scan.
+
+Run from the repository root:
+
+    python benchmarks/bench_colors.py
+"""
+from __future__ import annotations
+
+import math
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "haven"))
+
+from havenlighting import colors  # noqa: E402
+
+SAMPLES = 10_000
+
+
+def legacy_closest_color_id(r, g, b):
+    """The Euclidean RGB scan HavenLight used before the colors module."""
+    closest_dist = float('inf')
+    closest_id = 24
+    for color_rgb, color_id in colors.HAVEN_RGB_MAP.items():
+        dist = math.sqrt((r - color_rgb[0]) ** 2 + (g - color_rgb[1]) ** 2 + (b - color_rgb[2]) ** 2)
+        if dist < closest_dist:
+            closest_dist = dist
+            closest_id = color_id
+    return closest_id
+
+
+def legacy_closest_kelvin_id(kelvin):
+    return min(colors.HAVEN_KELVIN_MAP.items(), key=lambda x: abs(x[0] - kelvin))[1]
+
+
+def bench(label: str, func, args: list) -> float:
+    timer = timeit.Timer(lambda: [func(*a) for a in args])
+    best = min(timer.repeat(repeat=5, number=1)) / len(args)
+    print(f"{label:<32} {best * 1e9:10.0f} ns/call")
+    return best
+
+
+def main() -> None:
+    rng = random.Random(0)
+    rgb = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(SAMPLES)]
+    kelvin = [(rng.uniform(2000, 6500),) for _ in range(SAMPLES)]
+
+    start = time.perf_counter()
+    colors.build_rgb_table()
+    print(f"{'LUT build (one-off)':<32} {time.perf_counter() - start:10.2f} s")
+
+    old = bench("rgb: legacy euclidean scan", legacy_closest_color_id, rgb)
+    new = bench("rgb: LUT lookup", colors.closest_color_id, rgb)
+    print(f"{'rgb speed-up':<32} {old / new:10.1f} x")
+
+    old = bench("kelvin: legacy min()", legacy_closest_kelvin_id, kelvin)
+    new = bench("kelvin: bisect", colors.closest_kelvin_id, kelvin)
+    print(f"{'kelvin speed-up':<32} {old / new:10.1f} x")
+
+    differ = sum(legacy_closest_color_id(*c) != colors.closest_color_id(*c) for c in rgb)
+    print(f"{'rgb matches that changed':<32} {differ / SAMPLES:10.1%}")
+
+
+if __name__ == "__main__":
+    main()
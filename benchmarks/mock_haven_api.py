@@ -0,0 +1,211 @@
+"""Local stand-in for the Haven Lighting API, for benchmarks.
+
+Serves the endpoints used by Credentials, Location and Light: Auth/Authenticate,
+Auth/Refresh, user/GetUserInfo, LightAndZones/OrderedList,
+Group/AllGroupsByLocation and Commands/*. Commands change the state returned
+by later list calls, so a command becomes visible on the next refresh.
+
+Run standalone from the repository root:
+
+    python benchmarks/mock_haven_api.py --port 8765 --zones 90 --groups 10 --latency 0.02
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+
+LOCATION_ID_BASE = 10_000
+ZONE_ID_BASE = 100_000
+GROUP_ID_BASE = 900_000
+GROUP_SIZE = 10
+TOKEN_LIFETIME = 3600
+
+
+def _token(user_id: int) -> str:
+    """An unsigned JWT whose exp claim Credentials can read."""
+    def part(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return ".".join((
+        part({"alg": "none"}),
+        part({"sub": user_id, "exp": int(time.time()) + TOKEN_LIFETIME}),
+        "",
+    ))
+
+
+class MockHavenApi:
+    """In-memory Haven account with configurable size, latency and errors."""
+
+    def __init__(
+        self,
+        zones: int = 9,
+        groups: int = 1,
+        locations: int = 1,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        # location id -> light id -> state
+        self.zones: dict[int, dict[int, dict]] = {}
+        self.groups: dict[int, dict[int, dict]] = {}
+        for index in range(locations):
+            loc_id = LOCATION_ID_BASE + index
+            zone_ids = [ZONE_ID_BASE + index * zones + n for n in range(zones)]
+            self.zones[loc_id] = {
+                zone_id: {"isOn": False, "brightness": 10, "colorId": None}
+                for zone_id in zone_ids
+            }
+            self.groups[loc_id] = {
+                GROUP_ID_BASE + index * groups + n: {
+                    "isOn": False,
+                    "brightness": 10,
+                    "colorId": None,
+                    "members": zone_ids[n * GROUP_SIZE:(n + 1) * GROUP_SIZE],
+                }
+                for n in range(groups)
+            }
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/api/Auth/Authenticate", self._auth)
+        app.router.add_post("/api/Auth/Refresh", self._auth)
+        app.router.add_get("/api/user/GetUserInfo", self._user_info)
+        app.router.add_get("/api/LightAndZones/OrderedList/{loc_id}", self._zones)
+        app.router.add_get("/api/Group/AllGroupsByLocation/{loc_id}", self._groups)
+        app.router.add_post("/api/Commands/{command}", self._command)
+        app.router.add_get("/stats", self._stats)
+        app.router.add_post("/stats/reset", self._reset)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        if request.path.startswith("/stats"):
+            return await handler(request)
+        resource = request.match_info.route.resource
+        self.requests[resource.canonical if resource else request.path] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.Response(status=503)
+        if not request.path.startswith("/api/Auth/") and "Authorization" not in request.headers:
+            return web.Response(status=401)
+        return await handler(request)
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        return web.json_response({"token": _token(1), "refreshToken": "refresh", "id": 1})
+
+    async def _user_info(self, request: web.Request) -> web.Response:
+        loc_ids = list(self.zones)
+        return web.json_response({
+            "firstName": "Bench",
+            "lastName": "Mark",
+            "defaultLocationId": loc_ids[0],
+            "locations": [
+                {"locationId": loc_id, "locationName": f"Site {loc_id}"} for loc_id in loc_ids
+            ],
+        })
+
+    async def _zones(self, request: web.Request) -> web.Response:
+        loc_id = int(request.match_info["loc_id"])
+        return web.json_response([
+            {
+                "id": zone_id,
+                "name": f"Zone {zone_id}",
+                "isZone": True,
+                "isOn": state["isOn"],
+                "lightBrightnessId": state["brightness"],
+                "colorId": state["colorId"],
+                "locationName": f"Site {loc_id}",
+            }
+            for zone_id, state in self.zones.get(loc_id, {}).items()
+        ])
+
+    async def _groups(self, request: web.Request) -> web.Response:
+        loc_id = int(request.match_info["loc_id"])
+        return web.json_response([
+            {
+                "groupId": group_id,
+                "groupName": f"Group {group_id}",
+                "isOn": state["isOn"],
+                "brightnessId": state["brightness"],
+                "colorId": state["colorId"],
+                "lightIds": state["members"],
+            }
+            for group_id, state in self.groups.get(loc_id, {}).items()
+        ])
+
+    async def _command(self, request: web.Request) -> web.Response:
+        command = request.match_info["command"]
+        payload = await request.json()
+        targets = self._targets(int(payload["id"]), payload.get("type") == "Group")
+        for state in targets:
+            if command == "On":
+                state["isOn"] = True
+            elif command == "Off":
+                state["isOn"] = False
+            elif command == "Brightness":
+                state["isOn"] = True
+                state["brightness"] = int(payload["brightness"])
+            elif command == "SetColor":
+                state["isOn"] = True
+                state["colorId"] = int(payload["colorId"])
+        return web.json_response({"success": bool(targets)})
+
+    def _targets(self, light_id: int, is_group: bool) -> list[dict]:
+        for loc_id, groups in self.groups.items():
+            if is_group and light_id in groups:
+                group = groups[light_id]
+                return [group, *(self.zones[loc_id][zone_id] for zone_id in group["members"])]
+        for zones in self.zones.values():
+            if light_id in zones:
+                return [zones[light_id]]
+        return []
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.requests))
+
+    async def _reset(self, request: web.Request) -> web.Response:
+        self.requests.clear()
+        return web.json_response({})
+
+
+def serve(port: int, **options) -> None:
+    """Serve a MockHavenApi on localhost until interrupted."""
+    web.run_app(MockHavenApi(**options).app(), host="127.0.0.1", port=port, print=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--zones", type=int, default=9, help="zones per location")
+    parser.add_argument("--groups", type=int, default=1, help="groups per location")
+    parser.add_argument("--locations", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 503")
+    args = parser.parse_args()
+    serve(
+        args.port,
+        zones=args.zones,
+        groups=args.groups,
+        locations=args.locations,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,242 @@
 """The Haven Lighting integration."""
 from __future__ import annotations
 
+import asyncio
+import logging
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.typing import ConfigType
 
 # FIX: Added the dot below to load your local folder
-from .havenlighting import HavenClient
+from .havenlighting import AuthenticationError, HavenClient, HavenException, Location
+from .auth import HavenTokenManager, async_get_token_store
+from .const import (
+    CONF_MAX_CONCURRENT_LOCATIONS,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_LOCATIONS,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DISCOVERY_RETRY_MAX,
+    DISCOVERY_RETRY_MIN,
+    DOMAIN,
+)
+from .coordinator import HavenLocationCoordinator
+from .models import HavenData
+from .reconcile import (
+    HavenRegistryReconciler,
+    async_topology_from_registry,
+    topology_from_locations,
+)
+from .services import async_setup_services
+from .topology import HavenTopologyStore
+
+_LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.LIGHT]
-DOMAIN = "haven"
+PLATFORMS: list[Platform] = [Platform.LIGHT, Platform.SENSOR]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Haven services."""
+    async_setup_services(hass)
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Haven Lighting from a config entry."""
-    client = HavenClient()
-    
-    # Authenticate with Haven
-    authenticated = await hass.async_add_executor_job(
-        client.authenticate,
-        entry.data["email"],
-        entry.data["password"]
+    # Reuse Home Assistant's pooled aiohttp session for all API traffic
+    client = HavenClient(
+        session=async_get_clientsession(hass),
+        max_concurrent_locations=entry.options.get(
+            CONF_MAX_CONCURRENT_LOCATIONS, DEFAULT_MAX_CONCURRENT_LOCATIONS
+        ),
     )
+    tokens = HavenTokenManager(hass, client, entry.data["email"])
+    topology = HavenTopologyStore(hass, entry.entry_id)
 
-    if not authenticated:
-        return False
+    if snapshot := await topology.async_load():
+        # Create entities from the last known topology right away; logging
+        # in and discovery reconcile it in the background
+        locations = client.restore_locations(snapshot)
+        reconciler = HavenRegistryReconciler(
+            hass, entry, client, topology, topology_from_locations(locations)
+        )
+        data = _async_create_runtime_data(hass, entry, client, reconciler, locations)
+        hass.data.setdefault(DOMAIN, {})
+        hass.data[DOMAIN][entry.entry_id] = data
+        entry.async_create_background_task(
+            hass,
+            _async_go_live(hass, entry, data, tokens),
+            f"{DOMAIN} {entry.title} discovery",
+        )
+    else:
+        try:
+            logged_in = await _async_login(entry, client, tokens)
+        except AuthenticationError as err:
+            await client.async_close()
+            raise ConfigEntryAuthFailed(f"Haven authentication failed: {err}") from err
+        except HavenException as err:
+            await client.async_close()
+            raise ConfigEntryNotReady(f"Unable to log in to Haven: {err}") from err
+        if not logged_in:
+            await client.async_close()
+            raise ConfigEntryAuthFailed("Haven authentication failed")
+        entry.async_on_unload(tokens.async_stop)
+
+        try:
+            locations = await _async_discover(entry, client)
+        except AuthenticationError as err:
+            await client.async_close()
+            raise ConfigEntryAuthFailed(f"Haven authentication failed: {err}") from err
+        except HavenException as err:
+            await client.async_close()
+            raise ConfigEntryNotReady(f"Unable to discover Haven locations: {err}") from err
+
+        # Without a snapshot, whatever the registry holds is the baseline;
+        # this full pass only happens on the first start
+        reconciler = HavenRegistryReconciler(
+            hass, entry, client, topology, async_topology_from_registry(hass, entry)
+        )
+        data = _async_create_runtime_data(hass, entry, client, reconciler, locations)
+
+        # First refresh of every location runs concurrently; a site that is
+        # down keeps retrying on its own instead of failing the whole entry
+        await asyncio.gather(
+            *(coordinator.async_refresh() for coordinator in data.coordinators.values())
+        )
+        if data.coordinators and not any(
+            coordinator.last_update_success for coordinator in data.coordinators.values()
+        ):
+            await client.async_close()
+            raise ConfigEntryNotReady("Unable to refresh any Haven location")
+        await reconciler.async_reconcile()
+        await topology.async_save(client.snapshot_locations())
 
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = client
+        hass.data.setdefault(DOMAIN, {})
+        hass.data[DOMAIN][entry.entry_id] = data
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    return True
+
+def _async_create_runtime_data(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    client: HavenClient,
+    reconciler: HavenRegistryReconciler,
+    locations: dict[int, Location],
+) -> HavenData:
+    """Create one coordinator per location; its lights share its refresh."""
+    data = HavenData(client=client, reconciler=reconciler)
+    min_interval = entry.options.get(CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL)
+    max_interval = entry.options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL)
+    for loc_id, location in locations.items():
+        data.coordinators[loc_id] = HavenLocationCoordinator(
+            hass, client, location, min_interval, max_interval, reconciler.async_schedule
+        )
+    return data
+
+async def _async_go_live(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: HavenData,
+    tokens: HavenTokenManager,
+) -> None:
+    """Log in, discover and refresh after a snapshot-based setup.
+
+    Rejected credentials start a reauth flow; other failures are retried
+    with backoff while the entities serve the stored topology.
+    """
+    client = data.client
+    logged_in = False
+    delay = DISCOVERY_RETRY_MIN
+    while True:
+        try:
+            if not logged_in:
+                if not await _async_login(entry, client, tokens):
+                    raise AuthenticationError("Invalid credentials")
+                logged_in = True
+                entry.async_on_unload(tokens.async_stop)
+            locations = await _async_discover(entry, client)
+            break
+        except AuthenticationError as err:
+            _LOGGER.error("Haven authentication failed for %s: %s", entry.title, err)
+            entry.async_start_reauth(hass)
+            return
+        except HavenException as err:
+            _LOGGER.warning(
+                "Haven start-up failed, using stored topology and retrying in %.0fs: %s",
+                delay, err,
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, DISCOVERY_RETRY_MAX)
+
+    # Refreshing the coordinators reconciles zones and groups that changed
+    # while Home Assistant was stopped
+    await asyncio.gather(
+        *(
+            coordinator.async_refresh()
+            for loc_id, coordinator in data.coordinators.items()
+            if loc_id in locations
+        )
+    )
+    if locations.keys() == data.coordinators.keys():
+        return
+
+    # A location appeared or disappeared; coordinators are per location, so
+    # record the new topology and set the entry up again
+    await asyncio.gather(
+        *(
+            client.async_refresh_location(location, True)
+            for loc_id, location in locations.items()
+            if loc_id not in data.coordinators
+        )
+    )
+    await data.reconciler.async_reconcile()
+    _LOGGER.info("Haven locations changed since last start, reloading %s", entry.title)
+    hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+
+async def _async_login(entry: ConfigEntry, client: HavenClient, tokens: HavenTokenManager) -> bool:
+    """Reuse persisted tokens; only fall back to the password when they are gone."""
+    if not await tokens.async_restore() and not await _async_authenticate(client, entry):
+        return False
+    await tokens.async_start()
     return True
 
+async def _async_discover(entry: ConfigEntry, client: HavenClient) -> dict[int, Location]:
+    """Discover locations, logging in again if the persisted tokens were revoked."""
+    try:
+        return await client.async_discover_locations()
+    except AuthenticationError:
+        if not await _async_authenticate(client, entry):
+            raise
+        return await client.async_discover_locations()
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def _async_authenticate(client: HavenClient, entry: ConfigEntry) -> bool:
+    """Authenticate with Haven using the stored password."""
+    return await client.async_authenticate(
+        entry.data["email"],
+        entry.data["password"]
+    )
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data: HavenData = hass.data[DOMAIN].pop(entry.entry_id)
+        await data.client.async_close()
+
+    return unload_ok
 
-    return unload_ok
\ No newline at end of file
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the persisted tokens and topology of a removed config entry."""
+    await async_get_token_store(hass).async_set(entry.data["email"], None)
+    await HavenTopologyStore(hass, entry.entry_id).async_remove()
@@ -0,0 +1,136 @@
+"""Token persistence and proactive refresh for Haven Lighting."""
+from __future__ import annotations
+
+from functools import partial
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, TOKEN_STORAGE_KEY, TOKEN_STORAGE_VERSION
+from .havenlighting import HavenClient, HavenException
+from .havenlighting.config import TOKEN_REFRESH_MARGIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_TOKEN_STORE = f"{DOMAIN}_token_store"
+
+
+class HavenTokenStore:
+    """Haven tokens persisted in Home Assistant storage, keyed by email."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, TOKEN_STORAGE_VERSION, TOKEN_STORAGE_KEY, private=True
+        )
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    async def _async_data(self) -> dict[str, dict[str, Any]]:
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+        return self._data
+
+    async def async_get(self, email: str) -> dict[str, Any] | None:
+        """Return the stored tokens of an account."""
+        return (await self._async_data()).get(email.lower())
+
+    async def async_set(self, email: str, tokens: dict[str, Any] | None) -> None:
+        """Store (or with None, forget) the tokens of an account."""
+        data = await self._async_data()
+        if tokens:
+            data[email.lower()] = tokens
+        else:
+            data.pop(email.lower(), None)
+        await self._store.async_save(data)
+
+
+@callback
+def async_get_token_store(hass: HomeAssistant) -> HavenTokenStore:
+    """Return the token store shared by all Haven config entries."""
+    if DATA_TOKEN_STORE not in hass.data:
+        hass.data[DATA_TOKEN_STORE] = HavenTokenStore(hass)
+    return hass.data[DATA_TOKEN_STORE]
+
+
+class HavenTokenManager:
+    """Keep a client's tokens persisted and refresh them before they lapse."""
+
+    def __init__(self, hass: HomeAssistant, client: HavenClient, email: str) -> None:
+        """Initialize the manager."""
+        self._hass = hass
+        self._client = client
+        self._email = email
+        self._store = async_get_token_store(hass)
+        self._cancel_refresh: CALLBACK_TYPE | None = None
+        self._remove_listener: CALLBACK_TYPE | None = None
+
+    async def async_restore(self) -> bool:
+        """Load persisted tokens into the client.
+
+        Returns True when the client holds a usable token afterwards. An
+        expired token is refreshed right away; if Haven rejects that the
+        caller has to authenticate with the password. Outages during the
+        refresh raise, so they are not mistaken for a rejected token.
+        """
+        tokens = await self._store.async_get(self._email)
+        if not tokens:
+            return False
+        self._client.restore_tokens(tokens)
+        expiry = self._client.token_expiry
+        if expiry is None or expiry - time.time() > TOKEN_REFRESH_MARGIN:
+            return True
+        return await self._client.async_refresh_token()
+
+    async def async_start(self) -> None:
+        """Persist the current tokens and keep them fresh from now on."""
+        await self._store.async_set(self._email, self._client.export_tokens())
+        self._remove_listener = self._client.add_token_listener(self._handle_token_update)
+        self._async_schedule_refresh()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop refreshing; persisted tokens stay for the next start."""
+        if self._remove_listener:
+            self._remove_listener()
+            self._remove_listener = None
+        if self._cancel_refresh:
+            self._cancel_refresh()
+            self._cancel_refresh = None
+
+    @callback
+    def _handle_token_update(self) -> None:
+        self._hass.async_create_task(
+            self._store.async_set(self._email, self._client.export_tokens())
+        )
+        self._async_schedule_refresh()
+
+    @callback
+    def _async_schedule_refresh(self) -> None:
+        if self._cancel_refresh:
+            self._cancel_refresh()
+            self._cancel_refresh = None
+        expiry = self._client.token_expiry
+        if expiry is None:
+            return
+        delay = max(0, expiry - time.time() - TOKEN_REFRESH_MARGIN)
+        # Requests refresh at the same margin; passing the token this refresh
+        # is meant to replace lets the client skip it if one already did
+        token = (self._client.export_tokens() or {}).get("token")
+        self._cancel_refresh = async_call_later(
+            self._hass, delay, partial(self._async_refresh, token)
+        )
+
+    async def _async_refresh(self, stale_token: str | None, _now: Any) -> None:
+        self._cancel_refresh = None
+        _LOGGER.debug("Refreshing Haven token ahead of expiry")
+        try:
+            refreshed = await self._client.async_refresh_token(stale_token)
+        except HavenException as err:
+            _LOGGER.warning("Background Haven token refresh failed: %s; will retry on next request", err)
+            return
+        if not refreshed:
+            _LOGGER.warning("Background Haven token refresh failed; will retry on next request")
@@ -2,27 +2,48 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Mapping
 from typing import Any
 
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 # FIX: Added dots below to load your local folder
 from .havenlighting import HavenClient
-from .havenlighting.exceptions import AuthenticationError
+from .havenlighting.exceptions import AuthenticationError, CircuitOpenError, TransientApiError
+from .auth import async_get_token_store
+from .const import (
+    CONF_MAX_CONCURRENT_LOCATIONS,
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_LOCATIONS,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "haven"
-
 class HavenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Haven Lighting."""
 
     VERSION = 1
 
+    _reauth_entry: config_entries.ConfigEntry
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> HavenOptionsFlow:
+        """Get the options flow for this handler."""
+        return HavenOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -31,14 +52,17 @@ class HavenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
             try:
-                client = HavenClient()
-                authenticated = await self.hass.async_add_executor_job(
-                    client.authenticate,
+                client = HavenClient(session=async_get_clientsession(self.hass))
+                authenticated = await client.async_authenticate(
                     user_input[CONF_EMAIL],
                     user_input[CONF_PASSWORD],
                 )
 
                 if authenticated:
+                    # Setup picks these up instead of logging in a second time
+                    await async_get_token_store(self.hass).async_set(
+                        user_input[CONF_EMAIL], client.export_tokens()
+                    )
                     return self.async_create_entry(
                         title=user_input[CONF_EMAIL],
                         data=user_input,
@@ -48,6 +72,8 @@ class HavenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             except AuthenticationError:
                 errors["base"] = "invalid_auth"
+            except (TransientApiError, CircuitOpenError):
+                errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
@@ -61,4 +87,88 @@ class HavenConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 }
             ),
             errors=errors,
-        )
\ No newline at end of file
+        )
+
+    async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
+        """Ask for the password again after Haven rejected the stored one."""
+        self._reauth_entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Check the new password and reload the entry with it."""
+        errors = {}
+        entry = self._reauth_entry
+        email = entry.data[CONF_EMAIL]
+
+        if user_input is not None:
+            try:
+                client = HavenClient(session=async_get_clientsession(self.hass))
+                if await client.async_authenticate(email, user_input[CONF_PASSWORD]):
+                    await async_get_token_store(self.hass).async_set(email, client.export_tokens())
+                    self.hass.config_entries.async_update_entry(
+                        entry, data={**entry.data, CONF_PASSWORD: user_input[CONF_PASSWORD]}
+                    )
+                    await self.hass.config_entries.async_reload(entry.entry_id)
+                    return self.async_abort(reason="reauth_successful")
+                errors["base"] = "invalid_auth"
+
+            except AuthenticationError:
+                errors["base"] = "invalid_auth"
+            except (TransientApiError, CircuitOpenError):
+                errors["base"] = "cannot_connect"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema({vol.Required(CONF_PASSWORD): str}),
+            description_placeholders={"email": email},
+            errors=errors,
+        )
+
+
+class HavenOptionsFlow(config_entries.OptionsFlow):
+    """Handle Haven Lighting options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling interval bounds and concurrency."""
+        errors = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_POLL_INTERVAL] > user_input[CONF_MAX_POLL_INTERVAL]:
+                errors["base"] = "invalid_poll_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_MIN_POLL_INTERVAL,
+                        default=options.get(CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_MAX_POLL_INTERVAL,
+                        default=options.get(CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_LOCATIONS,
+                        default=options.get(
+                            CONF_MAX_CONCURRENT_LOCATIONS, DEFAULT_MAX_CONCURRENT_LOCATIONS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                }
+            ),
+            errors=errors,
+        )
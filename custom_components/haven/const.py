@@ -0,0 +1,58 @@
+"""Constants for the Haven Lighting integration."""
+from __future__ import annotations
+
+from typing import Final
+
+from .havenlighting.config import (
+    MAX_CONCURRENT_LOCATIONS,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+)
+
+DOMAIN: Final = "haven"
+
+# Options: bounds (seconds) of the adaptive polling interval
+CONF_MIN_POLL_INTERVAL: Final = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL: Final = "max_poll_interval"
+DEFAULT_MIN_POLL_INTERVAL: Final = int(POLL_MIN_INTERVAL)
+DEFAULT_MAX_POLL_INTERVAL: Final = int(POLL_MAX_INTERVAL)
+
+# Options: how many locations of the account refresh at once
+CONF_MAX_CONCURRENT_LOCATIONS: Final = "max_concurrent_locations"
+DEFAULT_MAX_CONCURRENT_LOCATIONS: Final = MAX_CONCURRENT_LOCATIONS
+
+# Cooldown used to coalesce refreshes requested after commands
+REQUEST_REFRESH_COOLDOWN: Final = 1.5
+# Delay after the last command before a refresh confirms its optimistic state
+COMMAND_CONFIRM_DELAY: Final = 2.0
+# Backoff (seconds) between discovery attempts after a snapshot-based start
+DISCOVERY_RETRY_MIN: Final = 30.0
+DISCOVERY_RETRY_MAX: Final = 600.0
+
+# State attributes exposed while serving last known state during outages
+ATTR_STALE: Final = "stale"
+ATTR_LAST_SUCCESSFUL_UPDATE: Final = "last_successful_update"
+
+# Persisted Haven tokens, keyed by account email
+TOKEN_STORAGE_KEY: Final = f"{DOMAIN}.tokens"
+TOKEN_STORAGE_VERSION: Final = 1
+
+# Last discovered topology (locations, zones, groups) of each config entry
+TOPOLOGY_STORAGE_VERSION: Final = 1
+
+
+# Sent with the entry ID when a refresh adds zones or groups to a location
+SIGNAL_TOPOLOGY_UPDATED: Final = f"{DOMAIN}_topology_updated_{{}}"
+
+# Scene services: apply many light states in one batch, capture them
+SERVICE_APPLY_SCENE: Final = "apply_scene"
+SERVICE_CAPTURE_SCENE: Final = "capture_scene"
+ATTR_ENTITIES: Final = "entities"
+ATTR_SCENE_ID: Final = "scene_id"
+ATTR_COLOR_ID: Final = "color_id"
+
+# Service recording a profile of the integration to the config directory
+SERVICE_PROFILE: Final = "profile"
+ATTR_DURATION: Final = "duration"
+DEFAULT_PROFILE_DURATION: Final = 60.0
+MAX_PROFILE_DURATION: Final = 3600.0
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""Data update coordinator for Haven Lighting locations."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import COMMAND_CONFIRM_DELAY, DOMAIN, REQUEST_REFRESH_COOLDOWN
+from .havenlighting import HavenClient, HavenException, Location, Priority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HavenLocationCoordinator(DataUpdateCoordinator[set[int]]):
+    """Fetch zones and groups for one Haven location once per interval.
+
+    Every HavenLight in the location shares this coordinator, so the number
+    of API calls per cycle does not grow with the number of entities. The
+    coordinator data is the set of light IDs that changed in the last
+    refresh, so only those entities write their state.
+
+    The polling interval follows the location's adaptive scheduler: fast
+    after commands or detected changes, slower while nothing happens.
+    Commands do not wait for a refresh: entities show the commanded state
+    at once and one delayed refresh confirms a burst of commands.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: HavenClient,
+        location: Location,
+        min_interval: float,
+        max_interval: float,
+        on_topology_change: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        location.poll_scheduler.configure(min_interval, max_interval)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {location.name}",
+            update_interval=timedelta(seconds=location.poll_scheduler.interval),
+            request_refresh_debouncer=Debouncer(
+                hass,
+                _LOGGER,
+                cooldown=REQUEST_REFRESH_COOLDOWN,
+                immediate=True,
+            ),
+        )
+        self.location = location
+        self._client = client
+        # When the last refresh succeeded; entities keep serving the state
+        # from then while the API is unreachable
+        self.last_success: datetime | None = None
+        self._on_topology_change = on_topology_change
+        self._topology_version = location.topology_version
+        self._unsub_confirm: CALLBACK_TYPE | None = None
+        # Priority of the next refresh; confirmations go before other polls
+        self._refresh_priority = Priority.BACKGROUND
+
+    async def async_request_confirmation(self) -> None:
+        """Refresh once, COMMAND_CONFIRM_DELAY after the last command."""
+        self._cancel_confirmation()
+        self._unsub_confirm = async_call_later(
+            self.hass, COMMAND_CONFIRM_DELAY, self._async_confirm
+        )
+
+    async def _async_confirm(self, _now: datetime) -> None:
+        self._unsub_confirm = None
+        self._refresh_priority = Priority.CONFIRM
+        await self.async_request_refresh()
+
+    async def async_refresh_confirmation(self) -> None:
+        """Refresh now, ahead of other polls, to confirm commands just sent."""
+        self._refresh_priority = Priority.CONFIRM
+        await self.async_refresh()
+
+    @callback
+    def _cancel_confirmation(self) -> None:
+        if self._unsub_confirm is not None:
+            self._unsub_confirm()
+            self._unsub_confirm = None
+
+    async def async_shutdown(self) -> None:
+        """Cancel a pending confirmation along with the scheduled refreshes."""
+        self._cancel_confirmation()
+        await super().async_shutdown()
+
+    async def _async_update_data(self) -> set[int]:
+        """Refresh all zones and groups of the location."""
+        priority, self._refresh_priority = self._refresh_priority, Priority.BACKGROUND
+        if not self._client.is_authenticated:
+            # Started from the topology snapshot and not logged in yet; the
+            # entities stay unavailable until the first real refresh
+            return set()
+        try:
+            changed = await self._client.async_refresh_location(self.location, True, priority)
+        except HavenException as err:
+            raise UpdateFailed(f"Error refreshing {self.location.name}: {err}") from err
+        self.last_success = dt_util.utcnow()
+        # Picked up when the next refresh is scheduled
+        self.update_interval = timedelta(seconds=self.location.poll_scheduler.interval)
+        if self.location.topology_version != self._topology_version:
+            # Zones or groups were added, removed or renamed
+            self._topology_version = self.location.topology_version
+            if self._on_topology_change is not None:
+                self._on_topology_change()
+        return changed
@@ -0,0 +1,42 @@
+"""Diagnostics support for Haven Lighting."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .models import HavenData
+
+# The entry title is the account email
+TO_REDACT = {"email", "password", "title", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data: HavenData = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "circuit": data.client.circuit_state,
+        "locations": {
+            str(loc_id): {
+                "lights": len(coordinator.location.lights),
+                "groups": sum(
+                    light._type == "Group" for light in coordinator.location.lights.values()
+                ),
+                "update_interval": coordinator.update_interval.total_seconds()
+                if coordinator.update_interval
+                else None,
+                "last_update_success": coordinator.last_update_success,
+                "last_success": coordinator.last_success.isoformat()
+                if coordinator.last_success
+                else None,
+            }
+            for loc_id, coordinator in data.coordinators.items()
+        },
+        "requests": data.client.metrics.as_dict(),
+    }
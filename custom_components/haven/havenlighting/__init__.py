@@ -1,14 +1,22 @@
 from .client import HavenClient
+from .commands import CommandIntent, CommandPlanner, LightCommandQueue
+from .dispatch import Priority
 from .devices.light import Light
 from .devices.location import Location
-from .exceptions import HavenException, AuthenticationError, DeviceError
+from .exceptions import HavenException, AuthenticationError, CircuitOpenError, DeviceError, RequestTimeoutError
 
 __version__ = "0.1.5"
 __all__ = [
     "HavenClient",
+    "CommandIntent",
+    "CommandPlanner",
+    "LightCommandQueue",
+    "Priority",
     "Light",
     "Location",
     "HavenException",
     "AuthenticationError",
+    "CircuitOpenError",
     "DeviceError",
+    "RequestTimeoutError",
 ] 
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Circuit breaker guarding the Haven Lighting API."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict
+
+from .config import CIRCUIT_COOLDOWN, CIRCUIT_FAILURE_THRESHOLD
+from .exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Fail fast while an API base URL keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and requests raise CircuitOpenError without touching the network.
+    Once ``cooldown`` has passed a single probe request is let through; its
+    success closes the circuit, its failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        cooldown: float = CIRCUIT_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self._state != CLOSED
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError unless a request may go out now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if time.monotonic() - self._opened_at >= self._cooldown:
+                # Let exactly one probe through; a probe that never reports
+                # back (e.g. cancelled) is replaced after another cool-down
+                self._state = HALF_OPEN
+                self._opened_at = time.monotonic()
+                logger.info("Probing %s after cool-down", self.name)
+                return
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuit closed for %s", self.name)
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self._failure_threshold:
+                if self._state != OPEN:
+                    logger.warning(
+                        "Circuit opened for %s after %d failures; failing fast for %.0fs",
+                        self.name, self._failures, self._cooldown
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(base_url: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of an API base URL."""
+    with _breakers_lock:
+        if base_url not in _breakers:
+            _breakers[base_url] = CircuitBreaker(base_url)
+        return _breakers[base_url]
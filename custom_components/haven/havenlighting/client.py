@@ -1,9 +1,15 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, Set
+import aiohttp
+from .config import MAX_CONCURRENT_LOCATIONS, RATE_LIMIT_PER_SECOND
 from .credentials import Credentials
+from .dispatch import Priority
 from .devices.light import Light
 from .devices.location import Location
 from .exceptions import AuthenticationError, ApiError
+from .metrics import RequestMetrics
+from .profiling import span
 from .logging import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -11,18 +17,34 @@ logger = logging.getLogger(__name__)
 class HavenClient:
     """Main client for interacting with Haven Lighting devices."""
     
-    def __init__(self, log_level: int = logging.INFO, log_file: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        log_level: int = logging.INFO,
+        log_file: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        rate_limit: float = RATE_LIMIT_PER_SECOND,
+        max_concurrent_locations: int = MAX_CONCURRENT_LOCATIONS,
+        api_base: Optional[str] = None,
+    ) -> None:
         """
         Initialize the Haven Lighting client.
         
         Args:
-            log_level: Logging level (default: INFO)
+            log_level: Logging level (default: INFO); ignored when the
+                application has configured logging itself
             log_file: Optional file path for logging output
+            session: Optional shared aiohttp session for the async API.
+                A session created by the client is closed by async_close().
+            rate_limit: Sustained API requests per second for this account; commands
+                and logins on the async path are not paced by it
+            max_concurrent_locations: How many locations refresh at once
+            api_base: Optional base URL replacing the Haven API endpoints
         """
         setup_logging(log_level, log_file)
-        self._credentials = Credentials()
+        self._credentials = Credentials(session, rate_limit=rate_limit, api_base=api_base)
         self._locations: Dict[int, Location] = {}
         self._lights: Dict[int, Light] = {}
+        self._refresh_slots = asyncio.Semaphore(max_concurrent_locations)
         logger.debug("Initialized HavenClient")
 
     def authenticate(self, email: str, password: str) -> bool:
@@ -34,10 +56,10 @@ class HavenClient:
             password: User's password
             
         Returns:
-            bool: True if authentication successful, False otherwise
+            bool: True if authentication successful, False if rejected
             
         Raises:
-            ApiError: If API request fails
+            TransientApiError, CircuitOpenError: If Haven cannot be reached
         """
         try:
             authenticated = self._credentials.authenticate(email, password)
@@ -50,11 +72,147 @@ class HavenClient:
             logger.error("API error during authentication: %s", str(e))
             raise
 
+    async def async_authenticate(self, email: str, password: str) -> bool:
+        """
+        Authenticate with the Haven Lighting service without blocking.
+
+        Args:
+            email: User's email address
+            password: User's password
+
+        Returns:
+            bool: True if authentication successful, False if rejected
+
+        Raises:
+            TransientApiError, CircuitOpenError: If Haven cannot be reached
+        """
+        try:
+            authenticated = await self._credentials.async_authenticate(email, password)
+            if authenticated:
+                logger.info("Successfully authenticated user: %s", email)
+            else:
+                logger.warning("Authentication failed for user: %s", email)
+            return authenticated
+        except ApiError as e:
+            logger.error("API error during authentication: %s", str(e))
+            raise
+
+    @property
+    def token_expiry(self) -> Optional[float]:
+        """Expiry of the current access token as a UNIX timestamp."""
+        return self._credentials.token_expiry
+
+    def export_tokens(self) -> Optional[Dict[str, Any]]:
+        """Return the current tokens so they can be persisted."""
+        return self._credentials.export_tokens()
+
+    def restore_tokens(self, tokens: Dict[str, Any]) -> None:
+        """Reuse previously persisted tokens instead of authenticating."""
+        self._credentials.restore_tokens(tokens)
+
+    def add_token_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Register a callback for token changes; returns a remover."""
+        return self._credentials.add_token_listener(listener)
+
+    @property
+    def metrics(self) -> RequestMetrics:
+        """Per-endpoint request counts and latencies of this account."""
+        return self._credentials.metrics
+
+    @property
+    def is_authenticated(self) -> bool:
+        """Whether the client holds tokens, restored or from logging in."""
+        return self._credentials.is_authenticated
+
+    @property
+    def circuit_state(self) -> str:
+        """State of the circuit breaker guarding the Haven API."""
+        return self._credentials._breaker(True).state
+
+    async def async_refresh_token(self, stale_token: Optional[str] = None) -> bool:
+        """Exchange the refresh token for a new access token.
+
+        With ``stale_token`` nothing is sent if that token was already
+        replaced, e.g. by a request that refreshed it ahead of expiry.
+        """
+        return await self._credentials.async_refresh_token(stale_token)
+
     def discover_locations(self) -> Dict[int, Location]:
         """Discover all available locations."""
         if not self._credentials:
             raise AuthenticationError("Not authenticated")
             
         locations = Location.discover(self._credentials)
-        self._locations.update(locations)
-        return self._locations 
\ No newline at end of file
+        self._merge_locations(locations)
+        return self._locations 
+
+    async def async_discover_locations(self) -> Dict[int, Location]:
+        """Discover all available locations without blocking."""
+        if not self._credentials:
+            raise AuthenticationError("Not authenticated")
+
+        locations = await Location.async_discover(self._credentials)
+        self._merge_locations(locations)
+        return self._locations
+
+    def _merge_locations(self, locations: Dict[int, Location]) -> None:
+        """Adopt discovered locations, keeping the objects already in use."""
+        self._locations = {
+            loc_id: self._locations.get(loc_id, location)
+            for loc_id, location in locations.items()
+        }
+
+    @property
+    def locations(self) -> Dict[int, Location]:
+        return self._locations
+
+    def snapshot_locations(self) -> Dict[str, Dict[str, Any]]:
+        """Topology of all locations, for persisting between restarts."""
+        return {str(loc_id): location.snapshot() for loc_id, location in self._locations.items()}
+
+    def restore_locations(self, snapshot: Dict[str, Dict[str, Any]]) -> Dict[int, Location]:
+        """Rebuild locations from snapshot_locations() output without calling the API."""
+        self._locations = {
+            int(loc_id): Location.from_snapshot(self._credentials, int(loc_id), location)
+            for loc_id, location in snapshot.items()
+        }
+        return self._locations
+
+    async def async_refresh_location(
+        self,
+        location: Location,
+        force: bool = False,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> Set[int]:
+        """Refresh one location once a refresh slot is free.
+
+        Every location refreshes independently; the slots only bound how many
+        run at once, so a slow site holds up a single slot, not the others.
+        Refreshes above BACKGROUND priority skip the slots; their requests
+        still queue behind commands in the credentials' dispatcher.
+        """
+        if priority < Priority.BACKGROUND:
+            with span("refresh"):
+                return await location.async_refresh_devices(force, priority=priority)
+        with span("refresh.queue"):
+            await self._refresh_slots.acquire()
+        try:
+            with span("refresh"):
+                return await location.async_refresh_devices(force, priority=priority)
+        finally:
+            self._refresh_slots.release()
+
+    async def async_refresh_locations(self, force: bool = False) -> None:
+        """Refresh all discovered locations concurrently.
+
+        The credentials cap how many requests are in flight at once, so a
+        large account fans out without flooding the API.
+        """
+        await asyncio.gather(
+            *(self.async_refresh_location(location, force) for location in self._locations.values())
+        )
+
+    async def async_close(self) -> None:
+        """Close the connections held by the client."""
+        await self._credentials.async_close()
+        logger.debug("Closed HavenClient")
\ No newline at end of file
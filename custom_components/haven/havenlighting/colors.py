@@ -0,0 +1,195 @@
+"""Perceptual matching of Home Assistant colors to Haven color IDs."""
+
+from __future__ import annotations
+
+import colorsys
+import math
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# --- MAPPING TABLES ---
+
+HAVEN_KELVIN_MAP: Dict[int, int] = {
+    2700: 1, 3000: 2, 3500: 3, 3700: 4,
+    4000: 5, 4100: 6, 4700: 7, 5000: 8,
+}
+
+HAVEN_RGB_MAP: Dict[Tuple[int, int, int], int] = {
+    (255, 0, 0): 11,      # Red
+    (255, 100, 0): 13,    # Pumpkin
+    (255, 191, 0): 14,    # Amber
+    (255, 128, 0): 15,    # Tangerine
+    (255, 215, 0): 16,    # Marigold
+    (255, 255, 0): 18,    # Yellow
+    (191, 255, 0): 19,    # Lime
+    (128, 255, 0): 20,    # Light Green
+    (0, 255, 0): 21,      # Green
+    (0, 255, 128): 22,    # Sea Foam
+    (64, 224, 208): 23,   # Turquoise
+    (0, 0, 255): 25,      # Deep Blue
+    (127, 0, 255): 26,    # Violet
+    (128, 0, 128): 27,    # Purple
+    (230, 230, 250): 28,  # Lavender
+    (255, 192, 203): 29,  # Pink
+    (255, 105, 180): 30,  # Hot Pink
+}
+
+HAVEN_EFFECT_MAP: Dict[str, int] = {
+    "Fire": 12,
+    "Sunset": 17,
+    "Ocean": 24
+}
+
+# Bits kept per RGB channel in the lookup table (32 levels -> 32768 cells)
+_LUT_BITS = 5
+_LUT_SHIFT = 8 - _LUT_BITS
+_LUT_LEVELS = 1 << _LUT_BITS
+
+Lab = Tuple[float, float, float]
+
+def _srgb_to_linear(channel: float) -> float:
+    channel /= 255
+    return channel / 12.92 if channel <= 0.04045 else ((channel + 0.055) / 1.055) ** 2.4
+
+def _linear_to_srgb(channel: float) -> float:
+    channel = max(0.0, channel)
+    value = channel * 12.92 if channel <= 0.0031308 else 1.055 * channel ** (1 / 2.4) - 0.055
+    return value * 255
+
+def _lab_f(t: float) -> float:
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+def rgb_to_lab(r: float, g: float, b: float) -> Lab:
+    """Convert sRGB (0-255) to CIELAB under D65."""
+    lr, lg, lb = _srgb_to_linear(r), _srgb_to_linear(g), _srgb_to_linear(b)
+    x = (0.4124564 * lr + 0.3575761 * lg + 0.1804375 * lb) / 0.95047
+    y = 0.2126729 * lr + 0.7151522 * lg + 0.0721750 * lb
+    z = (0.0193339 * lr + 0.1191920 * lg + 0.9503041 * lb) / 1.08883
+    fx, fy, fz = _lab_f(x), _lab_f(y), _lab_f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+def delta_e_2000(lab1: Lab, lab2: Lab) -> float:
+    """CIEDE2000 color difference."""
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+    c_bar = (math.hypot(a1, b1) + math.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - math.sqrt(c_bar ** 7 / (c_bar ** 7 + 25 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = math.hypot(a1p, b1), math.hypot(a2p, b2)
+    h1p = math.degrees(math.atan2(b1, a1p)) % 360
+    h2p = math.degrees(math.atan2(b2, a2p)) % 360
+
+    dlp = l2 - l1
+    dcp = c2p - c1p
+    if c1p * c2p == 0:
+        dhp = 0.0
+    elif abs(h2p - h1p) <= 180:
+        dhp = h2p - h1p
+    elif h2p - h1p > 180:
+        dhp = h2p - h1p - 360
+    else:
+        dhp = h2p - h1p + 360
+    dhp_big = 2 * math.sqrt(c1p * c2p) * math.sin(math.radians(dhp / 2))
+
+    lp_bar = (l1 + l2) / 2
+    cp_bar = (c1p + c2p) / 2
+    if c1p * c2p == 0:
+        hp_bar = h1p + h2p
+    elif abs(h1p - h2p) <= 180:
+        hp_bar = (h1p + h2p) / 2
+    elif h1p + h2p < 360:
+        hp_bar = (h1p + h2p + 360) / 2
+    else:
+        hp_bar = (h1p + h2p - 360) / 2
+
+    t = (1 - 0.17 * math.cos(math.radians(hp_bar - 30))
+         + 0.24 * math.cos(math.radians(2 * hp_bar))
+         + 0.32 * math.cos(math.radians(3 * hp_bar + 6))
+         - 0.20 * math.cos(math.radians(4 * hp_bar - 63)))
+    d_theta = 30 * math.exp(-(((hp_bar - 275) / 25) ** 2))
+    r_c = 2 * math.sqrt(cp_bar ** 7 / (cp_bar ** 7 + 25 ** 7))
+    s_l = 1 + 0.015 * (lp_bar - 50) ** 2 / math.sqrt(20 + (lp_bar - 50) ** 2)
+    s_c = 1 + 0.045 * cp_bar
+    s_h = 1 + 0.015 * cp_bar * t
+    r_t = -math.sin(math.radians(2 * d_theta)) * r_c
+
+    return math.sqrt(
+        (dlp / s_l) ** 2
+        + (dcp / s_c) ** 2
+        + (dhp_big / s_h) ** 2
+        + r_t * (dcp / s_c) * (dhp_big / s_h)
+    )
+
+def _full_intensity(r: float, g: float, b: float) -> Tuple[float, float, float]:
+    # Brightness is controlled separately, so colors are compared at full
+    # intensity; this keeps dark and light shades of a hue on that hue.
+    peak = max(r, g, b)
+    scale = 255 / peak if peak else 0
+    return r * scale, g * scale, b * scale
+
+_PALETTE: List[Tuple[Lab, int]] = [
+    (rgb_to_lab(*_full_intensity(*rgb)), color_id) for rgb, color_id in HAVEN_RGB_MAP.items()
+]
+_KELVINS: List[int] = sorted(HAVEN_KELVIN_MAP)
+
+# 0 marks a cell that has not been matched yet (Haven color IDs start at 1)
+_rgb_lut = bytearray(_LUT_LEVELS ** 3)
+
+def _match_lab(lab: Lab) -> int:
+    return min(_PALETTE, key=lambda entry: delta_e_2000(lab, entry[0]))[1]
+
+def _match_cell(index: int) -> int:
+    """Match the center of a lookup table cell against the palette."""
+    half = 1 << (_LUT_SHIFT - 1) if _LUT_SHIFT else 0
+    r = ((index >> (2 * _LUT_BITS)) << _LUT_SHIFT) + half
+    g = (((index >> _LUT_BITS) & (_LUT_LEVELS - 1)) << _LUT_SHIFT) + half
+    b = ((index & (_LUT_LEVELS - 1)) << _LUT_SHIFT) + half
+    return _match_lab(rgb_to_lab(*_full_intensity(r, g, b)))
+
+def closest_color_id(r: int, g: int, b: int) -> int:
+    """Haven color ID perceptually closest to an RGB color.
+
+    Lookups go through a quantized RGB table; each cell is matched with
+    CIEDE2000 the first time it is used, so every later lookup is O(1).
+    """
+    index = ((int(r) >> _LUT_SHIFT) << (2 * _LUT_BITS)) | ((int(g) >> _LUT_SHIFT) << _LUT_BITS) | (int(b) >> _LUT_SHIFT)
+    color_id = _rgb_lut[index]
+    if not color_id:
+        color_id = _rgb_lut[index] = _match_cell(index)
+    return color_id
+
+def build_rgb_table() -> None:
+    """Fill the whole lookup table ahead of time (takes a few seconds)."""
+    for index in range(len(_rgb_lut)):
+        if not _rgb_lut[index]:
+            _rgb_lut[index] = _match_cell(index)
+
+def closest_kelvin_id(kelvin: float) -> int:
+    """Haven white ID closest to a color temperature, by bisection."""
+    pos = bisect_left(_KELVINS, kelvin)
+    if pos == 0:
+        return HAVEN_KELVIN_MAP[_KELVINS[0]]
+    if pos == len(_KELVINS):
+        return HAVEN_KELVIN_MAP[_KELVINS[-1]]
+    below, above = _KELVINS[pos - 1], _KELVINS[pos]
+    return HAVEN_KELVIN_MAP[below if kelvin - below <= above - kelvin else above]
+
+@lru_cache(maxsize=256)
+def closest_color_id_hs(hue: float, saturation: float) -> int:
+    """Haven color ID closest to a hue (0-360) / saturation (0-100) pair."""
+    r, g, b = colorsys.hsv_to_rgb(hue / 360, saturation / 100, 1)
+    return closest_color_id(round(r * 255), round(g * 255), round(b * 255))
+
+@lru_cache(maxsize=256)
+def closest_color_id_xy(x: float, y: float) -> int:
+    """Haven color ID closest to a CIE 1931 xy chromaticity."""
+    if y <= 0:
+        return closest_color_id(255, 255, 255)
+    big_x, big_z = x / y, (1 - x - y) / y
+    r = 3.2404542 * big_x - 1.5371385 - 0.4985314 * big_z
+    g = -0.9692660 * big_x + 1.8760108 + 0.0415560 * big_z
+    b = 0.0556434 * big_x - 0.2040259 + 1.0572252 * big_z
+    rgb = [_linear_to_srgb(channel) for channel in (r, g, b)]
+    peak = max(rgb) or 1
+    return closest_color_id(*(round(min(255, channel * 255 / peak)) for channel in rgb))
@@ -0,0 +1,189 @@
+"""Command coalescing for Haven lights."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import COMMAND_DEBOUNCE, GROUP_BATCH_WINDOW
+from .logging import ThrottledLogger
+from .profiling import span
+
+if TYPE_CHECKING:
+    from .devices.light import Light
+    from .devices.location import Location
+
+logger = logging.getLogger(__name__)
+_throttled = ThrottledLogger(logger)
+
+@dataclass(frozen=True)
+class CommandIntent:
+    """Desired state of a light; None leaves an attribute untouched."""
+    on: Optional[bool] = None
+    brightness: Optional[int] = None
+    color: Optional[int] = None
+
+    def merge(self, newer: "CommandIntent") -> "CommandIntent":
+        """Combine with a newer intent, letting its values win."""
+        if newer.on is False:
+            # Turning off supersedes any pending brightness or color
+            return newer
+        if self.on is False:
+            return newer if newer.on else replace(newer, on=True)
+        return CommandIntent(
+            on=True if (self.on or newer.on) else None,
+            brightness=self.brightness if newer.brightness is None else newer.brightness,
+            color=self.color if newer.color is None else newer.color,
+        )
+
+
+Dispatcher = Callable[["Light", CommandIntent], Awaitable[None]]
+
+
+class LightCommandQueue:
+    """Debounced per-light command queue.
+
+    Intents submitted within the debounce window are merged into one, sent
+    with the fewest API calls, and ``on_drain`` runs once after the queue
+    has emptied; submitters do not wait for it.
+    """
+
+    def __init__(
+        self,
+        light: "Light",
+        on_drain: Optional[Callable[[], Awaitable[None]]] = None,
+        dispatch: Optional[Dispatcher] = None,
+        debounce: float = COMMAND_DEBOUNCE,
+    ) -> None:
+        self._light = light
+        self._on_drain = on_drain
+        self._dispatch = dispatch
+        self._debounce = debounce
+        self._pending: Optional[CommandIntent] = None
+        self._waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> Optional[CommandIntent]:
+        return self._pending
+
+    async def async_submit(self, intent: CommandIntent) -> None:
+        """Queue an intent and wait until it has been sent."""
+        self._pending = intent if self._pending is None else self._pending.merge(intent)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._async_run())
+        await asyncio.shield(waiter)
+
+    async def _async_run(self) -> None:
+        try:
+            while self._pending is not None:
+                await asyncio.sleep(self._debounce)
+                intent, self._pending = self._pending, None
+                waiters, self._waiters = self._waiters, []
+                try:
+                    await self._async_send(intent)
+                except Exception as e:
+                    _throttled.error("Failed to send queued command for %s: %s", self._light.name, str(e))
+                finally:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+                if self._pending is None:
+                    # Polls from here on may confirm what ``Light.expect`` showed
+                    self._light.mark_sent()
+                    if self._on_drain is not None:
+                        try:
+                            await self._on_drain()
+                        except Exception as e:
+                            _throttled.error("Failed to refresh after commands for %s: %s", self._light.name, str(e))
+        finally:
+            for waiter in self._waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+    async def _async_send(self, intent: CommandIntent) -> None:
+        _throttled.debug("Sending %s to %s", intent, self._light.name)
+        with span("command.send"):
+            if self._dispatch is not None:
+                await self._dispatch(self._light, intent)
+            else:
+                await self._light.async_apply(intent)
+
+
+class CommandPlanner:
+    """Batch commands across a location and fan them out via Haven groups.
+
+    Intents dispatched within the batching window are bucketed by their
+    exact value. Whenever every zone of a known group is in the same
+    bucket, a single group command replaces the individual zone commands.
+    """
+
+    def __init__(self, location: "Location", window: float = GROUP_BATCH_WINDOW) -> None:
+        self._location = location
+        self._window = window
+        self._batch: Dict[int, Tuple["Light", CommandIntent]] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def async_dispatch(self, light: "Light", intent: CommandIntent) -> None:
+        """Add a command to the current batch and wait until it is sent."""
+        self._batch[light.id] = (light, intent)
+        self._location.poll_scheduler.note_activity()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._async_flush())
+        await asyncio.shield(waiter)
+
+    def plan(self, batch: Dict[int, Tuple["Light", CommandIntent]]) -> List[Tuple["Light", CommandIntent]]:
+        """Return the commands to send, using groups where they fit exactly."""
+        buckets: Dict[CommandIntent, Set[int]] = {}
+        for light_id, (_, intent) in batch.items():
+            buckets.setdefault(intent, set()).add(light_id)
+
+        lights = self._location.lights
+        commands: List[Tuple["Light", CommandIntent]] = []
+        for intent, ids in buckets.items():
+            remaining = set(ids)
+            for group_id in self._covering_groups(remaining):
+                members = self._location.group_members(group_id)
+                if members <= remaining:
+                    commands.append((lights[group_id], intent))
+                    remaining -= members
+            commands.extend((batch[light_id][0], intent) for light_id in remaining)
+        return commands
+
+    def _covering_groups(self, zone_ids: Set[int]) -> List[int]:
+        """Groups whose members are all in ``zone_ids``, largest first."""
+        candidates = set()
+        for zone_id in zone_ids:
+            candidates.update(self._location.groups_of(zone_id))
+        covering = [
+            group_id for group_id in candidates
+            if group_id not in zone_ids
+            and group_id in self._location.lights
+            and self._location.group_members(group_id) <= zone_ids
+        ]
+        return sorted(covering, key=lambda g: len(self._location.group_members(g)), reverse=True)
+
+    async def _async_flush(self) -> None:
+        await asyncio.sleep(self._window)
+        batch, self._batch = self._batch, {}
+        waiters, self._waiters = self._waiters, []
+        try:
+            with span("command.plan"):
+                commands = self.plan(batch)
+            if len(commands) < len(batch):
+                logger.debug("Sending %d commands for %d lights via groups", len(commands), len(batch))
+            with span("command.flush"):
+                await asyncio.gather(*(light.async_apply(intent) for light, intent in commands))
+        except Exception as e:
+            _throttled.error("Failed to send batched commands: %s", str(e))
+        finally:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
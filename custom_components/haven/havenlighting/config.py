@@ -4,7 +4,57 @@ from typing import Final
 
 # API Configuration
 API_TIMEOUT: Final[int] = 30
+# Per endpoint class, seconds (connect, read, total): to open a connection,
+# between reads of a response, and for the whole call including retries and
+# a token refresh
+REQUEST_TIMEOUTS: Final[dict] = {
+    "auth": (10.0, 20.0, API_TIMEOUT),
+    "poll": (5.0, 15.0, API_TIMEOUT),
+    "command": (5.0, 5.0, 10.0),
+}
 MAX_RETRIES: Final[int] = 3
+# Per-account token bucket: sustained requests per second and burst size.
+# INTERACTIVE requests on the async path are exempt
+RATE_LIMIT_PER_SECOND: Final[float] = 5.0
+RATE_LIMIT_BURST: Final[int] = 10
+# Exponential backoff (seconds) for 5xx responses, 429s and timeouts
+RETRY_BACKOFF_BASE: Final[float] = 0.5
+RETRY_BACKOFF_MAX: Final[float] = 10.0
+# Retries may not exceed this share of requests per window (plus a floor)
+RETRY_BUDGET_RATIO: Final[float] = 0.2
+RETRY_BUDGET_MIN: Final[int] = 3
+RETRY_BUDGET_WINDOW: Final[float] = 60.0
+# Circuit breaker: consecutive failures before failing fast, and cool-down
+CIRCUIT_FAILURE_THRESHOLD: Final[int] = 5
+CIRCUIT_COOLDOWN: Final[float] = 60.0
+# Refresh the access token this many seconds before it expires
+TOKEN_REFRESH_MARGIN: Final[int] = 300
+# Upper bound on async requests in flight at once per account
+MAX_CONCURRENT_REQUESTS: Final[int] = 4
+# Upper bound on locations refreshing at once per account
+MAX_CONCURRENT_LOCATIONS: Final[int] = 4
+# Adaptive polling (seconds): fastest and slowest interval, how long to stay
+# fast after activity, and the growth factor while nothing changes
+POLL_MIN_INTERVAL: Final[float] = 5.0
+POLL_MAX_INTERVAL: Final[float] = 300.0
+POLL_ACTIVE_PERIOD: Final[float] = 60.0
+POLL_BACKOFF_FACTOR: Final[float] = 1.5
+# Full topology parse (create, rename, remove lights) at least this often
+# (seconds); polls in between only update the state of known lights
+TOPOLOGY_REFRESH_INTERVAL: Final[float] = 3600.0
+# Request latency histograms (seconds): first bucket, last bucket, growth
+METRICS_BUCKET_MIN: Final[float] = 0.001
+METRICS_BUCKET_MAX: Final[float] = 120.0
+METRICS_BUCKET_GROWTH: Final[float] = 1.2
+# Hot-path logging: seconds between repeats of one error, debug sampling 1/N
+LOG_THROTTLE_INTERVAL: Final[float] = 60.0
+LOG_DEBUG_SAMPLE_RATE: Final[int] = 10
+# Window (seconds) in which commands for one light are merged
+COMMAND_DEBOUNCE: Final[float] = 0.1
+# Commands of one scene in flight at once
+SCENE_CONCURRENCY: Final[int] = 8
+# Window (seconds) in which commands across a location are batched into groups
+GROUP_BATCH_WINDOW: Final[float] = 0.05
 
 # Light States
 LIGHT_STATE: Final[dict] = {
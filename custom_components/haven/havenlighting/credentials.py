@@ -1,61 +1,206 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, List, Optional
+import asyncio
+import base64
+import json
+import threading
+import time
+import aiohttp
 import requests
 import logging
-from .exceptions import AuthenticationError, ApiError
-from .config import DEVICE_ID, API_TIMEOUT
+from .exceptions import (
+    AuthenticationError,
+    ApiError,
+    CircuitOpenError,
+    HavenException,
+    RateLimitError,
+    RequestTimeoutError,
+    TransientApiError,
+)
+from .config import (
+    DEVICE_ID,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_RETRIES,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_SECOND,
+    TOKEN_REFRESH_MARGIN,
+)
+from .circuit import CircuitBreaker, breaker_for
+from .dispatch import Priority, RequestDispatcher, priority_for
+from .metrics import RequestMetrics
+from .logging import ThrottledLogger
+from .profiling import span
+from .ratelimit import RetryBudget, TokenBucket, backoff_delay, parse_retry_after
+from .timeouts import Deadline, RequestTimeout, enforce, timeout_for
 
 # GIADA FIX: Pointing both to Production API (was stg-api)
 AUTH_API_BASE = "https://api.havenlighting.com/api"
 PROD_API_BASE = "https://api.havenlighting.com/api"
 
 logger = logging.getLogger(__name__)
+# Failures repeat on every poll during an outage
+_throttled = ThrottledLogger(logger)
 
 class Credentials:
     """Handles authentication and request credentials."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        rate_limit: float = RATE_LIMIT_PER_SECOND,
+        burst: int = RATE_LIMIT_BURST,
+        api_base: Optional[str] = None,
+    ):
         self._token: Optional[str] = None
         self._refresh_token: Optional[str] = None
         self._user_id: Optional[int] = None
+        self._token_expiry: Optional[float] = None
+        self._token_listeners: List[Callable[[], None]] = []
+        # Both APIs can be pointed elsewhere, e.g. at a local stand-in
+        self._auth_api_base = api_base or AUTH_API_BASE
+        self._prod_api_base = api_base or PROD_API_BASE
+        # Single-flight refresh: callers that lose the race wait on the lock
+        # and then reuse the token the winner obtained. The two locks do not
+        # see each other, so one instance must use either the threaded or
+        # the async methods, not both at once.
+        self._refresh_lock = threading.Lock()
+        self._async_refresh_lock = asyncio.Lock()
+        # Pooled transports: a requests.Session for the threaded path and an
+        # aiohttp session for the async path, so connections are kept alive.
+        self._http: Optional[requests.Session] = None
+        self._session = session
+        self._owns_session = session is None
+        # Caps concurrent fan-out (zones + groups, several locations) and
+        # lets commands overtake queued polls
+        self._dispatcher = RequestDispatcher(MAX_CONCURRENT_REQUESTS)
+        self._rate_limiter = TokenBucket(rate_limit, burst)
+        self._retry_budget = RetryBudget()
+        self.metrics = RequestMetrics()
         logger.debug("Initialized Credentials")
         
     @property
     def is_authenticated(self) -> bool:
         return bool(self._token and self._user_id)
+
+    @property
+    def token_expiry(self) -> Optional[float]:
+        """Expiry of the access token as a UNIX timestamp, if it carries one."""
+        return self._token_expiry
+
+    @property
+    def token_expiring(self) -> bool:
+        """True when the access token lapses within TOKEN_REFRESH_MARGIN."""
+        return (
+            self._token_expiry is not None
+            and self._token_expiry - time.time() < TOKEN_REFRESH_MARGIN
+        )
+
+    def export_tokens(self) -> Optional[Dict[str, Any]]:
+        """Return the tokens in the API's own format, for persisting."""
+        if not self.is_authenticated:
+            return None
+        return {
+            "token": self._token,
+            "refreshToken": self._refresh_token,
+            "id": self._user_id
+        }
+
+    def restore_tokens(self, data: Dict[str, Any]) -> None:
+        """Reuse tokens persisted by export_tokens() instead of logging in."""
+        self._update_credentials(data)
+        logger.debug("Restored credentials for user ID: %s", self._user_id)
+
+    def add_token_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call ``listener`` whenever the tokens change; returns a remover.
+
+        Listeners run in the thread or task that obtained the new token.
+        """
+        self._token_listeners.append(listener)
+        return lambda: self._token_listeners.remove(listener)
         
     def authenticate(self, email: str, password: str) -> bool:
-        """Authenticate with the Haven Lighting service."""
+        """Authenticate with the Haven Lighting service.
+
+        Returns False when Haven rejects the credentials. Outages raise
+        TransientApiError or CircuitOpenError instead.
+        """
         logger.debug("Attempting authentication for user: %s", email)
         
-        # FIX: Payload uses userName instead of email
-        payload = {
-            "userName": email,
-            "password": password
-        }
-        
         try:
             response = self._make_request_internal(
                 "POST",
                 "/Auth/Authenticate", 
-                json=payload,
+                json=self._auth_payload(email, password),
                 auth_required=False
             )
+            return self._handle_auth_response(email, response)
             
-            # FIX: Check for token directly in the root response
-            if not response or "token" not in response:
-                logger.error("Authentication failed: No token returned for user %s", email)
-                return False
-                
-            self._update_credentials(response)
-            logger.info("Successfully authenticated user: %s", email)
-            return True
-            
+        except (TransientApiError, CircuitOpenError):
+            # Haven could not be reached; the credentials were not rejected
+            raise
         except ApiError as e:
             logger.error("Authentication failed for user %s: %s", email, str(e))
             return False
+
+    async def async_authenticate(self, email: str, password: str) -> bool:
+        """Authenticate with the Haven Lighting service without blocking, as ``authenticate``."""
+        logger.debug("Attempting authentication for user: %s", email)
+
+        try:
+            with span("auth.authenticate"):
+                response = await self._async_make_request_internal(
+                    "POST",
+                    "/Auth/Authenticate",
+                    json=self._auth_payload(email, password),
+                    auth_required=False
+                )
+            return self._handle_auth_response(email, response)
+
+        except (TransientApiError, CircuitOpenError):
+            raise
+        except ApiError as e:
+            logger.error("Authentication failed for user %s: %s", email, str(e))
+            return False
+
+    @staticmethod
+    def _auth_payload(email: str, password: str) -> Dict[str, Any]:
+        # FIX: Payload uses userName instead of email
+        return {
+            "userName": email,
+            "password": password
+        }
+
+    def _handle_auth_response(self, email: str, response: Dict[str, Any]) -> bool:
+        # FIX: Check for token directly in the root response
+        if not response or "token" not in response:
+            logger.error("Authentication failed: No token returned for user %s", email)
+            return False
+
+        self._update_credentials(response)
+        logger.info("Successfully authenticated user: %s", email)
+        return True
             
-    def refresh_token(self) -> bool:
-        """Refresh the authentication token."""
+    def refresh_token(self, stale_token: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """Refresh the authentication token.
+
+        With ``stale_token`` the refresh is skipped when another thread has
+        already replaced that token, so concurrent 401s cause one refresh.
+        ``deadline`` is the calling request's; waiting for another thread's
+        refresh counts against it.
+
+        Returns False when Haven rejects the refresh token; outages raise
+        TransientApiError or CircuitOpenError.
+        """
+        if not self._refresh_lock.acquire(timeout=deadline.remaining() if deadline else -1):
+            raise RequestTimeoutError(f"Deadline exceeded for {deadline.path}")
+        try:
+            if stale_token is not None and self._token != stale_token:
+                _throttled.debug("Token already refreshed by another request")
+                return True
+            return self._refresh_token_locked(deadline)
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_token_locked(self, deadline: Optional[Deadline] = None) -> bool:
         if not self._refresh_token or not self._user_id:
             logger.debug("Cannot refresh token - missing refresh token or user ID")
             return False
@@ -69,12 +214,57 @@ class Credentials:
                     "refreshToken": self._refresh_token,
                     "userId": self._user_id
                 },
-                auth_required=False
+                auth_required=False,
+                deadline=deadline
             )
             self._update_credentials(response)
             logger.debug("Token refresh successful")
             return True
-            
+
+        except (TransientApiError, CircuitOpenError):
+            # Not a rejected token; the caller may retry or fail the request
+            raise
+        except ApiError as e:
+            logger.error("Token refresh failed: %s", str(e))
+            return False
+
+    async def async_refresh_token(self, stale_token: Optional[str] = None, deadline: Optional[Deadline] = None) -> bool:
+        """Refresh the authentication token without blocking.
+
+        With ``stale_token`` the refresh is skipped when another task has
+        already replaced that token, so concurrent 401s cause one refresh.
+        ``deadline`` is the calling request's, as for ``refresh_token``.
+        """
+        async with self._async_refresh_lock:
+            if stale_token is not None and self._token != stale_token:
+                _throttled.debug("Token already refreshed by another request")
+                return True
+            return await self._async_refresh_token_locked(deadline)
+
+    async def _async_refresh_token_locked(self, deadline: Optional[Deadline] = None) -> bool:
+        if not self._refresh_token or not self._user_id:
+            logger.debug("Cannot refresh token - missing refresh token or user ID")
+            return False
+
+        try:
+            logger.debug("Attempting token refresh for user ID: %s", self._user_id)
+            with span("auth.refresh"):
+                response = await self._async_make_request_internal(
+                    "POST",
+                    "/Auth/Refresh",
+                    json={
+                        "refreshToken": self._refresh_token,
+                        "userId": self._user_id
+                    },
+                    auth_required=False,
+                    deadline=deadline
+                )
+            self._update_credentials(response)
+            logger.debug("Token refresh successful")
+            return True
+
+        except (TransientApiError, CircuitOpenError):
+            raise
         except ApiError as e:
             logger.error("Token refresh failed: %s", str(e))
             return False
@@ -84,6 +274,19 @@ class Credentials:
         self._token = data.get("token")
         self._refresh_token = data.get("refreshToken")
         self._user_id = data.get("id")
+        self._token_expiry = self._decode_expiry(self._token)
+        for listener in list(self._token_listeners):
+            listener()
+
+    @staticmethod
+    def _decode_expiry(token: Optional[str]) -> Optional[float]:
+        """Read the ``exp`` claim of a JWT without verifying it."""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return None
         
     def make_request(
         self, 
@@ -91,60 +294,333 @@ class Credentials:
         path: str, 
         auth_required: bool = True,
         use_prod_api: bool = False,
-        timeout: int = API_TIMEOUT,
+        timeout: Optional[float] = None,
         **kwargs: Any
     ) -> Dict[str, Any]:
-        """Make an authenticated API request with automatic token refresh."""
+        """Make an authenticated API request with automatic token refresh.
+
+        The call, token refresh and retries included, must finish within
+        the endpoint class's total timeout (REQUEST_TIMEOUTS) or ``timeout``
+        seconds if given; otherwise RequestTimeoutError is raised.
+        """
+        deadline = Deadline.for_request(method, path, timeout)
+        token = self._token
+        if auth_required and self.token_expiring:
+            # Refresh ahead of expiry rather than paying for a 401 round-trip
+            self.refresh_token(token, deadline)
+            token = self._token
         try:
             return self._make_request_internal(
                 method=method, 
                 path=path, 
                 auth_required=auth_required,
                 use_prod_api=use_prod_api,
-                timeout=timeout,
+                deadline=deadline,
                 **kwargs
             )
         except AuthenticationError:
             logger.info("Authentication error, attempting token refresh")
-            if self.refresh_token():
+            if self.refresh_token(token, deadline):
                 logger.info("Token refresh successful, retrying request")
                 return self._make_request_internal(
                     method=method, 
                     path=path, 
                     auth_required=auth_required,
                     use_prod_api=use_prod_api,
-                    timeout=timeout,
+                    deadline=deadline,
                     **kwargs
                 )
             logger.error("Token refresh failed, unable to retry request")
             raise AuthenticationError("Token refresh failed")
-        
-    def _make_request_internal(
-        self, 
-        method: str, 
-        path: str, 
+
+    async def async_make_request(
+        self,
+        method: str,
+        path: str,
         auth_required: bool = True,
         use_prod_api: bool = False,
-        timeout: int = API_TIMEOUT,
+        timeout: Optional[float] = None,
+        priority: Optional[Priority] = None,
         **kwargs: Any
     ) -> Dict[str, Any]:
-        """Internal method for making API requests."""
+        """Make an authenticated API request on the shared aiohttp session.
+
+        Bounded like ``make_request``; when the deadline passes, whatever is
+        in flight (request, backoff or token refresh) is cancelled. The
+        request is also cancelled when the calling task is.
+
+        Requests wait for a free slot by ``priority``: commands are
+        INTERACTIVE and GETs BACKGROUND unless given.
+        """
+        deadline = Deadline.for_request(method, path, timeout)
+        async with enforce(deadline):
+            token = self._token
+            if auth_required and self.token_expiring:
+                # Refresh ahead of expiry rather than paying for a 401 round-trip
+                await self.async_refresh_token(token, deadline)
+                token = self._token
+            try:
+                return await self._async_make_request_internal(
+                    method=method,
+                    path=path,
+                    auth_required=auth_required,
+                    use_prod_api=use_prod_api,
+                    deadline=deadline,
+                    priority=priority,
+                    **kwargs
+                )
+            except AuthenticationError:
+                logger.info("Authentication error, attempting token refresh")
+                if await self.async_refresh_token(token, deadline):
+                    logger.info("Token refresh successful, retrying request")
+                    return await self._async_make_request_internal(
+                        method=method,
+                        path=path,
+                        auth_required=auth_required,
+                        use_prod_api=use_prod_api,
+                        deadline=deadline,
+                        priority=priority,
+                        **kwargs
+                    )
+                logger.error("Token refresh failed, unable to retry request")
+                raise AuthenticationError("Token refresh failed")
+
+    async def async_close(self) -> None:
+        """Release pooled connections owned by these credentials."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+        self.close()
+
+    def close(self) -> None:
+        """Release the pooled connections of the threaded transport."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+            self._owns_session = True
+        return self._session
+
+    def _get_http(self) -> requests.Session:
+        if self._http is None:
+            self._http = requests.Session()
+        return self._http
+
+    def _prepare_request(
+        self,
+        path: str,
+        auth_required: bool,
+        use_prod_api: bool,
+        kwargs: Dict[str, Any]
+    ) -> str:
+        """Validate credentials, attach the bearer token and build the URL."""
         if auth_required and not self.is_authenticated:
             raise AuthenticationError("Authentication required")
             
-        base_url = PROD_API_BASE if use_prod_api else AUTH_API_BASE
-        url = f"{base_url}{path}"
+        base_url = self._prod_api_base if use_prod_api else self._auth_api_base
         
         if self._token:
             headers = kwargs.pop("headers", {})
             headers["Authorization"] = f"Bearer {self._token}"
             kwargs["headers"] = headers
             
+        return f"{base_url}{path}"
+        
+    def _make_request_internal(
+        self, 
+        method: str, 
+        path: str, 
+        auth_required: bool = True,
+        use_prod_api: bool = False,
+        deadline: Optional[Deadline] = None,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """Internal method for making API requests.
+
+        Requests are paced by the account's token bucket; transient failures
+        are retried with jittered backoff while the retry budget and the
+        deadline (the endpoint class's unless given) allow.
+        """
+        limits = timeout_for(method, path)
+        if deadline is None:
+            deadline = Deadline(path, limits.total)
+        breaker = self._breaker(use_prod_api)
+        self._retry_budget.record_request()
+        attempt = 0
+        while True:
+            breaker.before_request()
+            self._rate_limiter.acquire()
+            # Raises once the pacing above has used up the time left
+            deadline.remaining()
+            started = time.perf_counter()
+            try:
+                result = self._send_request(
+                    method, path, auth_required, use_prod_api, limits, deadline, dict(kwargs)
+                )
+            except TransientApiError as e:
+                self.metrics.record(path, time.perf_counter() - started, e)
+                if isinstance(e, RateLimitError):
+                    # Throttled, but the API is up
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                delay = self._retry_delay(e, path, attempt, deadline)
+                if delay is None:
+                    raise
+            except HavenException as e:
+                self.metrics.record(path, time.perf_counter() - started, e)
+                # The API answered, so it is reachable
+                breaker.record_success()
+                raise
+            else:
+                self.metrics.record(path, time.perf_counter() - started)
+                breaker.record_success()
+                return result
+            time.sleep(delay)
+            attempt += 1
+
+    async def _async_make_request_internal(
+        self,
+        method: str,
+        path: str,
+        auth_required: bool = True,
+        use_prod_api: bool = False,
+        deadline: Optional[Deadline] = None,
+        priority: Optional[Priority] = None,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """Internal method for making API requests with aiohttp.
+
+        Requests are paced by the account's token bucket; transient failures
+        are retried with jittered backoff while the retry budget and the
+        deadline (the endpoint class's unless given) allow.
+        """
+        limits = timeout_for(method, path)
+        if deadline is None:
+            deadline = Deadline(path, limits.total)
+        if priority is None:
+            priority = priority_for(method, path)
+        async with enforce(deadline):
+            return await self._async_request_loop(
+                method, path, auth_required, use_prod_api, limits, deadline, priority, kwargs
+            )
+
+    async def _async_request_loop(
+        self,
+        method: str,
+        path: str,
+        auth_required: bool,
+        use_prod_api: bool,
+        limits: RequestTimeout,
+        deadline: Deadline,
+        priority: Priority,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        breaker = self._breaker(use_prod_api)
+        self._retry_budget.record_request()
+        # A queued poll is dropped for a newer one of the same endpoint
+        key = (method, path) if priority is Priority.BACKGROUND and method == "GET" else None
+
+        async def send() -> Dict[str, Any]:
+            # Paced once a slot is granted, so tokens also go out by priority.
+            # Commands and logins are not paced: the dispatcher already caps
+            # them, and a scene's fan-out would otherwise trickle out
+            if priority is not Priority.INTERACTIVE:
+                await self._rate_limiter.async_acquire()
+            started = time.perf_counter()
+            try:
+                result = await self._async_send_request(
+                    method, path, auth_required, use_prod_api, limits, dict(kwargs)
+                )
+            except asyncio.CancelledError:
+                if deadline.expired:
+                    # Cut off by the deadline: a timeout like any other
+                    self.metrics.record(path, time.perf_counter() - started, RequestTimeoutError(path))
+                raise
+            except HavenException as e:
+                self.metrics.record(path, time.perf_counter() - started, e)
+                raise
+            self.metrics.record(path, time.perf_counter() - started)
+            return result
+
+        attempt = 0
+        while True:
+            breaker.before_request()
+            try:
+                result = await self._dispatcher.async_run(priority, send, key)
+            except asyncio.CancelledError:
+                if deadline.expired:
+                    breaker.record_failure()
+                raise
+            except TransientApiError as e:
+                if isinstance(e, RateLimitError):
+                    # Throttled, but the API is up
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                delay = self._retry_delay(e, path, attempt, deadline)
+                if delay is None:
+                    raise
+            except HavenException:
+                # The API answered, so it is reachable
+                breaker.record_success()
+                raise
+            else:
+                breaker.record_success()
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _breaker(self, use_prod_api: bool) -> CircuitBreaker:
+        return breaker_for(self._prod_api_base if use_prod_api else self._auth_api_base)
+
+    def _retry_delay(self, error: TransientApiError, path: str, attempt: int, deadline: Deadline) -> Optional[float]:
+        """Seconds to wait before retrying, or None to give up."""
+        if attempt >= MAX_RETRIES:
+            return None
+        delay = backoff_delay(attempt)
+        if isinstance(error, RateLimitError) and error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        if not deadline.allows(delay) or not self._retry_budget.try_spend():
+            # No time left to retry in; fail now instead of at the deadline
+            return None
+        _throttled.warning("Retrying %s in %.1fs (attempt %d): %s", path, delay, attempt + 1, error.message, key=path)
+        return delay
+
+    @staticmethod
+    def _check_status(status: int, retry_after: Optional[str]) -> None:
+        """Map error statuses the request layer handles to exceptions."""
+        if status == 401:
+            raise AuthenticationError("Received 401 Unauthorized response")
+        if status == 429:
+            raise RateLimitError("Received 429 Too Many Requests response", retry_after=parse_retry_after(retry_after))
+        if status >= 500:
+            raise TransientApiError(f"Server error: {status}", code=status)
+
+    def _send_request(
+        self,
+        method: str,
+        path: str,
+        auth_required: bool,
+        use_prod_api: bool,
+        limits: RequestTimeout,
+        deadline: Deadline,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        url = self._prepare_request(path, auth_required, use_prod_api, kwargs)
+        # requests bounds connecting and each read, not the whole response
+        timeout = (
+            min(limits.connect, deadline.remaining()),
+            min(limits.read, deadline.remaining()),
+        )
+
         try:
-            response = requests.request(method, url, timeout=timeout, **kwargs)
+            response = self._get_http().request(method, url, timeout=timeout, **kwargs)
             
-            if response.status_code == 401:
-                raise AuthenticationError("Received 401 Unauthorized response")
+            self._check_status(response.status_code, response.headers.get("Retry-After"))
             
             response.raise_for_status()
             
@@ -154,6 +630,47 @@ class Credentials:
             data = response.json()
             return data
             
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            _throttled.error("Request failed: %s", str(e), key=path)
+            raise TransientApiError(f"Request failed: {str(e)}")
         except requests.exceptions.RequestException as e:
-            logger.error("Request failed: %s", str(e))
+            _throttled.error("Request failed: %s", str(e), key=path)
+            raise ApiError(f"Request failed: {str(e)}")
+
+    async def _async_send_request(
+        self,
+        method: str,
+        path: str,
+        auth_required: bool,
+        use_prod_api: bool,
+        limits: RequestTimeout,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        url = self._prepare_request(path, auth_required, use_prod_api, kwargs)
+        # The deadline, enforced around the whole call, bounds the total
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=limits.connect,
+            sock_read=limits.read,
+        )
+
+        try:
+            async with self._get_session().request(
+                method, url, timeout=timeout, **kwargs
+            ) as response:
+                self._check_status(response.status, response.headers.get("Retry-After"))
+
+                response.raise_for_status()
+
+                if response.status == 204:
+                    return {}
+
+                with span("request.decode"):
+                    return await response.json(content_type=None)
+
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            _throttled.error("Request failed: %s", str(e), key=path)
+            raise TransientApiError(f"Request failed: {str(e)}")
+        except (aiohttp.ClientError, ValueError) as e:
+            _throttled.error("Request failed: %s", str(e), key=path)
             raise ApiError(f"Request failed: {str(e)}")
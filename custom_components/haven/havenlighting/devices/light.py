@@ -1,12 +1,26 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
+import asyncio
+import contextlib
+import dataclasses
 import logging
-from ..models import LightData
+import threading
+from ..commands import CommandIntent
+from ..models import LightData, next_sequence
 from ..credentials import Credentials
+from ..logging import ThrottledLogger
 
 logger = logging.getLogger(__name__)
+# Every command fails while the API is down
+_throttled = ThrottledLogger(logger)
 
 class Light:
-    """Represents a Haven light device."""
+    """Represents a Haven light device.
+
+    State is an immutable LightData snapshot, replaced as a whole under a
+    per-light lock, so commands and refreshes may run concurrently from
+    tasks or threads. Polled data carries the sequence number taken when it
+    was requested; data requested before a command returned is ignored.
+    """
 
     def __init__(self, credentials: Credentials, location_id: int, light_id: int, data: Dict[str, Any]) -> None:
         self._credentials = credentials
@@ -14,9 +28,25 @@ class Light:
         self._type = "Zone" if data.get("isZone") else "Device"
         if data.get("type"):
             self._type = data.get("type")
-            
-        self.update_from_data(data)
-        logger.debug("Initialized Light: %s (ID: %d, Type: %s)", self.name, self.id, self._type)
+        self._lock = threading.Lock()
+        # Commands sent but not yet answered, plus one while ``expect``ed
+        # commands wait in a queue; polls are ignored while any are out
+        self._outstanding = 0
+        # Whether ``expect`` holds one of those until ``mark_sent``
+        self._held = False
+        # Polls requested before this sequence number predate a command
+        self._stale_before = 0
+        # Commanded state shown before the API confirms it
+        self._expected: Optional[CommandIntent] = None
+
+        self._data = LightData(
+            light_id=int(data.get("id")),
+            name=data.get("name", "Unknown"),
+            pattern_speed=None,
+            seq=next_sequence(),
+            **self._polled_state(data),
+        )
+        _throttled.debug("Initialized Light: %s (ID: %d, Type: %s)", self.name, self.id, self._type)
 
     @property
     def id(self) -> int:
@@ -34,52 +64,263 @@ class Light:
     def brightness(self) -> int:
         return int(self._data.brightness * 25.5)
 
-    def update_from_data(self, data: Dict[str, Any]) -> None:
-        is_on = data.get("isOn", False)
-        # Handle potential key mismatch between Zones (lightBrightnessId) and Groups (brightnessId)
-        brightness = data.get("lightBrightnessId", data.get("brightnessId", 10))
-        
-        self._data = LightData(
-            light_id=int(data.get("id", self._data.light_id if hasattr(self, '_data') else data.get("id"))),
-            name=data.get("name", "Unknown"),
-            status=1 if is_on else 0,
-            brightness=brightness,
-            color=data.get("colorId"),
-            pattern_speed=None
-        )
+    @property
+    def data(self) -> LightData:
+        """The current state snapshot."""
+        return self._data
+
+    @staticmethod
+    def _polled_state(data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "status": 1 if data.get("isOn", False) else 0,
+            # Handle potential key mismatch between Zones (lightBrightnessId) and Groups (brightnessId)
+            "brightness": data.get("lightBrightnessId", data.get("brightnessId", 10)),
+            "color": data.get("colorId"),
+        }
+
+    def update_from_data(self, data: Dict[str, Any], as_of: Optional[int] = None) -> bool:
+        """Apply API data; return True if name/on/brightness/color changed.
+
+        ``as_of`` is the sequence number taken when the data was requested;
+        see ``update_state``. The name is applied either way.
+        """
+        state = self._polled_state(data)
+        with self._lock:
+            if not self._accepts(as_of, state):
+                state = {}
+            return self._set(name=data.get("name", "Unknown"), **state)
+
+    def update_state(self, is_on: bool, brightness: int, color: Optional[int], as_of: Optional[int] = None) -> bool:
+        """Apply polled on/brightness/color only; return True if any changed.
+
+        With ``as_of``, the sequence number taken when the data was
+        requested, a poll that started before the last command returned (or
+        while one is still out) is ignored, and the first one after an
+        ``expect`` confirms the command or reverts the light.
+        """
+        state = {"status": 1 if is_on else 0, "brightness": brightness, "color": color}
+        with self._lock:
+            if not self._accepts(as_of, state):
+                return False
+            return self._set(**state)
+
+    def expect(self, intent: CommandIntent) -> None:
+        """Show the outcome of ``intent`` now, before its command is sent."""
+        state: Dict[str, Any] = {}
+        if intent.on is False:
+            state["status"] = 0
+        elif intent.on or intent.brightness is not None or intent.color is not None:
+            state["status"] = 1
+            if intent.brightness is not None:
+                state["brightness"] = intent.brightness
+            if intent.color is not None:
+                state["color"] = intent.color
+        with self._lock:
+            if not self._held:
+                # Also after ``mark_sent`` while the first command awaits its
+                # confirming poll: this one has not been sent yet
+                self._held = True
+                self._outstanding += 1
+            self._expected = intent if self._expected is None else self._expected.merge(intent)
+            self._set(**state)
+
+    def mark_sent(self) -> None:
+        """The commands behind ``expect`` are out; later polls may confirm them."""
+        with self._lock:
+            if self._held:
+                self._held = False
+                self._outstanding -= 1
+                self._stale_before = next_sequence()
+
+    def _set(self, **changes: Any) -> bool:
+        """Replace the snapshot if ``changes`` alter it; call with the lock held."""
+        current = self._data
+        if all(getattr(current, field) == value for field, value in changes.items()):
+            return False
+        self._data = dataclasses.replace(current, seq=next_sequence(), **changes)
+        return True
+
+    def _accepts(self, as_of: Optional[int], state: Dict[str, Any]) -> bool:
+        """Whether polled state may replace ours; call with the lock held."""
+        if as_of is None:
+            return True
+        if self._outstanding or as_of < self._stale_before:
+            # Requested before a command went out; keep the commanded state
+            return False
+        expected, self._expected = self._expected, None
+        if expected is None:
+            return True
+        if expected.on is False:
+            confirmed = state["status"] == 0
+        else:
+            confirmed = (
+                state["status"] == 1
+                and expected.brightness in (None, state["brightness"])
+                and expected.color in (None, state["color"])
+            )
+        if not confirmed:
+            _throttled.warning(
+                "Haven did not apply %s to %s, reverting to the reported state",
+                expected, self.name, key=self.id,
+            )
+        return True
+
+    @contextlib.contextmanager
+    def _command(self) -> Iterator[Dict[str, Any]]:
+        """Hold off polls while a command is out.
+
+        The block fills the yielded dict with the state the command produced;
+        it is applied when the block ends.
+        """
+        result: Dict[str, Any] = {}
+        with self._lock:
+            self._outstanding += 1
+        try:
+            yield result
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                self._stale_before = next_sequence()
+                self._set(**result)
+
+    def _response_state(self, response: Any) -> Dict[str, Any]:
+        """State a command response reports for this light, if it has any."""
+        if isinstance(response, dict) and isinstance(response.get("data"), dict):
+            response = response["data"]
+        if not isinstance(response, dict) or "isOn" not in response:
+            return {}
+        if int(response.get("id", response.get("lightId", self.id))) != self.id:
+            return {}
+        state = {"status": 1 if response["isOn"] else 0}
+        brightness = response.get("lightBrightnessId", response.get("brightnessId"))
+        if brightness is not None:
+            state["brightness"] = brightness
+        if "colorId" in response:
+            state["color"] = response["colorId"]
+        return state
 
     def turn_on(self) -> None:
         try:
-            self._send_simple_command("/Commands/On")
-            self._data.status = 1
+            with self._command() as result:
+                response = self._send_simple_command("/Commands/On")
+                result.update(status=1)
+                result.update(self._response_state(response))
         except Exception as e:
-            logger.error("Failed to turn on %s", str(e))
+            _throttled.error("Failed to turn on %s", str(e))
+
+    async def async_turn_on(self) -> None:
+        try:
+            with self._command() as result:
+                response = await self._async_send_simple_command("/Commands/On")
+                result.update(status=1)
+                result.update(self._response_state(response))
+        except Exception as e:
+            _throttled.error("Failed to turn on %s", str(e))
 
     def turn_off(self) -> None:
         try:
-            self._send_simple_command("/Commands/Off")
-            self._data.status = 0
+            with self._command() as result:
+                response = self._send_simple_command("/Commands/Off")
+                result.update(status=0)
+                result.update(self._response_state(response))
+        except Exception as e:
+            _throttled.error("Failed to turn off %s", str(e))
+
+    async def async_turn_off(self) -> None:
+        try:
+            with self._command() as result:
+                response = await self._async_send_simple_command("/Commands/Off")
+                result.update(status=0)
+                result.update(self._response_state(response))
         except Exception as e:
-            logger.error("Failed to turn off %s", str(e))
+            _throttled.error("Failed to turn off %s", str(e))
 
     def set_brightness(self, level: int) -> None:
         level = max(0, min(10, int(level)))
         try:
-            payload = {"id": self.id, "type": self._type, "brightness": level}
-            self._credentials.make_request("POST", "/Commands/Brightness", json=payload, use_prod_api=True)
-            self._data.brightness = level
-            self._data.status = 1 
+            with self._command() as result:
+                response = self._credentials.make_request("POST", "/Commands/Brightness", json=self._brightness_payload(level), use_prod_api=True)
+                result.update(brightness=level, status=1)
+                result.update(self._response_state(response))
         except Exception as e:
-            logger.error("Failed to set brightness %s", str(e))
+            _throttled.error("Failed to set brightness %s", str(e))
+
+    async def async_set_brightness(self, level: int) -> None:
+        level = max(0, min(10, int(level)))
+        try:
+            with self._command() as result:
+                response = await self._credentials.async_make_request("POST", "/Commands/Brightness", json=self._brightness_payload(level), use_prod_api=True)
+                result.update(brightness=level, status=1)
+                result.update(self._response_state(response))
+        except Exception as e:
+            _throttled.error("Failed to set brightness %s", str(e))
 
     def set_color(self, color_id: int) -> None:
         try:
-            payload = {"id": self.id, "type": self._type, "colorId": int(color_id)}
-            self._credentials.make_request("POST", "/Commands/SetColor", json=payload, use_prod_api=True)
-            self._data.color = color_id
+            with self._command() as result:
+                response = self._credentials.make_request("POST", "/Commands/SetColor", json=self._color_payload(color_id), use_prod_api=True)
+                result.update(color=color_id)
+                result.update(self._response_state(response))
+        except Exception as e:
+            _throttled.error("Failed to set color %s", str(e))
+
+    async def async_set_color(self, color_id: int) -> None:
+        try:
+            with self._command() as result:
+                response = await self._credentials.async_make_request("POST", "/Commands/SetColor", json=self._color_payload(color_id), use_prod_api=True)
+                result.update(color=color_id)
+                result.update(self._response_state(response))
         except Exception as e:
-            logger.error("Failed to set color %s", str(e))
+            _throttled.error("Failed to set color %s", str(e))
+
+    def capture(self) -> CommandIntent:
+        """The current state as an intent that restores it."""
+        data = self._data
+        if data.status != 1:
+            return CommandIntent(on=False)
+        return CommandIntent(on=True, brightness=data.brightness, color=data.color)
+
+    def changes_for(self, intent: CommandIntent) -> Optional[CommandIntent]:
+        """The part of ``intent`` that differs from the known state, or None."""
+        data = self._data
+        if intent.on is False:
+            return intent if data.status == 1 else None
+        brightness = intent.brightness if intent.brightness != data.brightness else None
+        color = intent.color if intent.color != data.color else None
+        if brightness is not None or color is not None:
+            return CommandIntent(on=True, brightness=brightness, color=color)
+        if intent.on and data.status != 1:
+            return CommandIntent(on=True)
+        return None
+
+    async def async_apply(self, intent: CommandIntent) -> None:
+        """Send the fewest commands that bring the light to ``intent``."""
+        if intent.on is False:
+            await self.async_turn_off()
+            return
+
+        # Brightness and color commands switch the light on by themselves
+        calls = []
+        if intent.brightness is not None:
+            calls.append(self.async_set_brightness(intent.brightness))
+        if intent.color is not None:
+            calls.append(self.async_set_color(intent.color))
+
+        if calls:
+            await asyncio.gather(*calls)
+        elif intent.on:
+            await self.async_turn_on()
+
+    def _brightness_payload(self, level: int) -> Dict[str, Any]:
+        return {"id": self.id, "type": self._type, "brightness": level}
+
+    def _color_payload(self, color_id: int) -> Dict[str, Any]:
+        return {"id": self.id, "type": self._type, "colorId": int(color_id)}
+
+    def _send_simple_command(self, endpoint: str) -> Any:
+        payload = {"id": self.id, "type": self._type}
+        return self._credentials.make_request("POST", endpoint, json=payload, use_prod_api=True)
 
-    def _send_simple_command(self, endpoint: str) -> None:
+    async def _async_send_simple_command(self, endpoint: str) -> Any:
         payload = {"id": self.id, "type": self._type}
-        self._credentials.make_request("POST", endpoint, json=payload, use_prod_api=True)
\ No newline at end of file
+        return await self._credentials.async_make_request("POST", endpoint, json=payload, use_prod_api=True)
\ No newline at end of file
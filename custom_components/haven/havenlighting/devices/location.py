@@ -1,15 +1,24 @@
-from typing import Dict, Any, Optional, ClassVar
+from typing import Dict, Any, Collection, FrozenSet, Iterable, Optional, ClassVar, Set, Tuple
+import asyncio
 import logging
 import time
-from ..models import LocationData
+from ..commands import CommandIntent, CommandPlanner
+from ..config import SCENE_CONCURRENCY, TOPOLOGY_REFRESH_INTERVAL
+from ..dispatch import Priority
+from ..models import LocationData, next_sequence
+from ..logging import ThrottledLogger
+from ..profiling import span
+from ..scheduler import AdaptivePollScheduler
 from .light import Light
 from ..credentials import Credentials
 
 logger = logging.getLogger(__name__)
+# Failures repeat on every poll during an outage
+_throttled = ThrottledLogger(logger)
 
 class Location:
     MIN_CAPABILITY_LEVEL: ClassVar[int] = 0
-    
+
     def __init__(self, credentials: Credentials, location_id: int, data: Optional[Dict[str, Any]] = None) -> None:
         self._credentials = credentials
         self._location_id = location_id
@@ -18,91 +27,481 @@ class Location:
             name=data.get("name", str(location_id)),
             owner_name=data.get("ownerName", "")
         ) if data else None
+        # Replaced, never changed in place, when lights come or go, so
+        # readers may iterate it while a refresh runs in another thread
         self._lights: Dict[int, Light] = {}
+        # Group membership index, both directions
+        self._group_members: Dict[int, FrozenSet[int]] = {}
+        self._zone_groups: Dict[int, Set[int]] = {}
+        self.planner = CommandPlanner(self)
+        self.poll_scheduler = AdaptivePollScheduler()
         self._last_refresh = 0
+        # Monotonic time of the last full topology parse; None until the first
+        self._last_topology_refresh: Optional[float] = None
+        # (topology_version, zones, groups) for the state tier's sanity check
+        self._counts: Optional[Tuple[int, int, int]] = None
+        # Bumped whenever lights appear, disappear or are renamed
+        self.topology_version = 0
         self._real_location_name = None # Store the real name (e.g., "Crescenti Oasis")
-        
+
+    @property
+    def id(self) -> int:
+        return self._location_id
+
     @property
     def name(self) -> str:
         # Return the real location name if we found it, otherwise fall back to Owner Name
         return self._real_location_name or self._data.owner_name if self._data else str(self._location_id)
-        
+
+    @property
+    def lights(self) -> Dict[int, Light]:
+        return self._lights
+
+    @property
+    def poll_due(self) -> bool:
+        """True once the adaptive poll interval has passed since the last refresh."""
+        return time.time() - self._last_refresh >= self.poll_scheduler.interval
+
+    @property
+    def topology_due(self) -> bool:
+        """True if the next refresh should re-parse names, membership and the light set."""
+        return (
+            self._last_topology_refresh is None
+            or time.monotonic() - self._last_topology_refresh >= TOPOLOGY_REFRESH_INTERVAL
+        )
+
+    def request_topology_refresh(self) -> None:
+        """Make the next refresh a topology refresh."""
+        self._last_topology_refresh = None
+
+    def group_members(self, group_id: int) -> FrozenSet[int]:
+        """Zone IDs that belong to a group."""
+        return self._group_members.get(group_id, frozenset())
+
+    def groups_of(self, zone_id: int) -> Iterable[int]:
+        """Group IDs a zone belongs to."""
+        return self._zone_groups.get(zone_id, ())
+
     @classmethod
     def discover(cls, credentials: Credentials) -> Dict[int, 'Location']:
         response = credentials.make_request("GET", "/user/GetUserInfo", use_prod_api=True)
+        return cls._locations_from_user_info(credentials, response)
+
+    @classmethod
+    async def async_discover(cls, credentials: Credentials) -> Dict[int, 'Location']:
+        response = await credentials.async_make_request("GET", "/user/GetUserInfo", use_prod_api=True)
+        return cls._locations_from_user_info(credentials, response)
+
+    @classmethod
+    def _locations_from_user_info(cls, credentials: Credentials, response: Dict[str, Any]) -> Dict[int, 'Location']:
+        """Every location the account can access, the default one included."""
+        owner_name = f"{response.get('firstName', '')} {response.get('lastName', '')}".strip()
         locations = {}
-        if "defaultLocationId" in response:
+        for item in cls._location_items(response):
+            loc_id = item.get("locationId", item.get("id"))
+            if loc_id is None or int(loc_id) in locations:
+                continue
+            loc_id = int(loc_id)
+            location = cls(credentials, loc_id, {
+                "name": str(loc_id),
+                "ownerName": item.get("ownerName") or owner_name
+            })
+            location._real_location_name = item.get("locationName", item.get("name"))
+            locations[loc_id] = location
+
+        # Accounts whose user info lists no locations only expose the default
+        if "defaultLocationId" in response and int(response["defaultLocationId"]) not in locations:
             loc_id = int(response["defaultLocationId"])
-            loc_data = {
+            locations[loc_id] = cls(credentials, loc_id, {
                 "name": str(loc_id),
-                "ownerName": f"{response.get('firstName', '')} {response.get('lastName', '')}".strip()
-            }
-            locations[loc_id] = cls(credentials, loc_id, loc_data)
+                "ownerName": owner_name
+            })
         return locations
 
-    def refresh_devices(self, force: bool = False) -> None:
-        if not force and (time.time() - self._last_refresh < 5):
-            return
+    @staticmethod
+    def _location_items(response: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        """Location entries of a user info payload, owned and shared."""
+        for key in ("locations", "userLocations", "sharedLocations"):
+            for item in response.get(key) or ():
+                if isinstance(item, dict):
+                    yield item
+
+    @classmethod
+    def from_snapshot(cls, credentials: Credentials, location_id: int, snapshot: Dict[str, Any]) -> 'Location':
+        """Rebuild a location and its lights from snapshot() output, offline."""
+        location = cls(credentials, location_id, {
+            "name": str(location_id),
+            "ownerName": snapshot.get("ownerName", "")
+        })
+        location._real_location_name = snapshot.get("locationName")
+        lights: Dict[int, Light] = {}
+        for item in snapshot.get("lights", []):
+            is_group = item["type"] == "Group"
+            location._add_or_update_light(lights, {
+                "id": item["id"],
+                "name": item["name"],
+                "type": item["type"],
+                "isZone": not is_group
+            }, is_group=is_group)
+        location._lights = lights
+        location._index_groups({
+            int(group_id): frozenset(members) for group_id, members in snapshot.get("groups", {}).items()
+        })
+        return location
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-safe topology of the location (names, types, groups), without state."""
+        return {
+            "ownerName": self._data.owner_name if self._data else "",
+            "locationName": self._real_location_name,
+            "lights": [
+                {"id": light.id, "name": light.name, "type": light._type}
+                for light in self._lights.values()
+            ],
+            "groups": {
+                str(group_id): sorted(members) for group_id, members in self._group_members.items()
+            },
+        }
+
+    def capture_scene(self, light_ids: Optional[Collection[int]] = None) -> Dict[int, CommandIntent]:
+        """Current state of the given lights (all zones by default) as a scene."""
+        lights = self._lights
+        if light_ids is None:
+            light_ids = [light_id for light_id, light in lights.items() if light._type != "Group"]
+        return {
+            light_id: lights[light_id].capture()
+            for light_id in light_ids
+            if light_id in lights
+        }
+
+    async def async_apply_scene(
+        self,
+        scene: Dict[int, CommandIntent],
+        concurrency: int = SCENE_CONCURRENCY,
+    ) -> int:
+        """Bring many lights to their target state at once; return the commands sent.
+
+        Lights already in their target state are skipped, the rest are
+        folded into group commands where possible, and the commands go out
+        together with at most ``concurrency`` in flight. The caller refreshes
+        once afterwards.
+        """
+        batch = {}
+        for light_id, intent in scene.items():
+            light = self._lights.get(light_id)
+            if light is None:
+                continue
+            needed = light.changes_for(intent)
+            if needed is not None:
+                batch[light_id] = (light, needed)
+        if not batch:
+            return 0
+
+        self.poll_scheduler.note_activity()
+        commands = self.planner.plan(batch)
+        slots = asyncio.Semaphore(concurrency)
+
+        async def send(light: Light, intent: CommandIntent) -> None:
+            async with slots:
+                await light.async_apply(intent)
+
+        with span("scene.apply"):
+            await asyncio.gather(*(send(light, intent) for light, intent in commands))
+        return len(commands)
+
+    def refresh_devices(self, force: bool = False, topology: Optional[bool] = None) -> Set[int]:
+        """Refresh zones and groups; return the IDs of lights that changed.
+
+        See ``async_refresh_devices`` for the meaning of ``topology``.
+        """
+        changed: Set[int] = set()
+        if not force and not self.poll_due:
+            return changed
+        if topology is None:
+            topology = self.topology_due
+        complete = True
+        # Lights ignore data requested before their latest command returned
+        as_of = next_sequence()
 
         # 1. Fetch Individual Zones
         try:
             response = self._credentials.make_request(
-                "GET", 
-                f"/LightAndZones/OrderedList/{self._location_id}", 
+                "GET",
+                f"/LightAndZones/OrderedList/{self._location_id}",
                 use_prod_api=True
             )
-            zone_list = response if isinstance(response, list) else response.get("data", [])
-            for item in zone_list:
-                # CAPTURE THE REAL LOCATION NAME
-                if not self._real_location_name and "locationName" in item:
-                    self._real_location_name = item["locationName"]
-                    
-                if item.get("isZone"):
-                    self._add_or_update_light(item, is_group=False)
+            changed |= self._apply_zone_payload(response, topology, as_of)
         except Exception as e:
-            logger.error("Failed to refresh zones: %s", str(e))
+            complete = False
+            _throttled.error("Failed to refresh zones of %s: %s", self._location_id, str(e), key=self._location_id)
 
         # 2. Fetch Groups
         try:
             response = self._credentials.make_request(
-                "GET", 
-                f"/Group/AllGroupsByLocation/{self._location_id}", 
+                "GET",
+                f"/Group/AllGroupsByLocation/{self._location_id}",
                 use_prod_api=True
             )
-            group_list = response if isinstance(response, list) else response.get("data", [])
-            for item in group_list:
-                group_data = {
-                    "id": item["groupId"],
-                    "name": item["groupName"],
-                    "isOn": item["isOn"],
-                    "lightBrightnessId": item.get("brightnessId", 10),
-                    "colorId": item.get("colorId"),
-                    "isZone": False,
-                    "type": "Group"
-                }
-                self._add_or_update_light(group_data, is_group=True)
+            changed |= self._apply_group_payload(response, topology, as_of)
         except Exception as e:
-            logger.error("Failed to refresh groups: %s", str(e))
+            complete = False
+            _throttled.error("Failed to refresh groups of %s: %s", self._location_id, str(e), key=self._location_id)
+
+        if topology and complete:
+            self._last_topology_refresh = time.monotonic()
+        self._last_refresh = time.time()
+        self.poll_scheduler.record_refresh(bool(changed))
+        return changed
+
+    async def async_refresh_devices(
+        self,
+        force: bool = False,
+        topology: Optional[bool] = None,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> Set[int]:
+        """Refresh zones and groups; return the IDs of lights that changed.
+
+        Refreshes come in two tiers. The state tier, used for most polls, only
+        updates on/brightness/color of lights that are already known. The
+        topology tier also creates, renames and removes lights and rebuilds
+        the group index; it runs when ``topology`` is True, when
+        ``topology_due``, and whenever the state tier meets an ID it does not
+        know or misses one it does. ``topology_version`` changes only there.
 
+        ``priority`` orders the requests against others of the account.
+        """
+        changed: Set[int] = set()
+        if not force and not self.poll_due:
+            return changed
+        if topology is None:
+            topology = self.topology_due
+
+        # Zones and groups are independent, so fetch both at once and merge
+        # whatever came back; a failure of one does not discard the other.
+        # Lights ignore data requested before their latest command returned
+        as_of = next_sequence()
+        with span("refresh.fetch"):
+            zones, groups = await asyncio.gather(
+                self._credentials.async_make_request(
+                    "GET",
+                    f"/LightAndZones/OrderedList/{self._location_id}",
+                    use_prod_api=True,
+                    priority=priority
+                ),
+                self._credentials.async_make_request(
+                    "GET",
+                    f"/Group/AllGroupsByLocation/{self._location_id}",
+                    use_prod_api=True,
+                    priority=priority
+                ),
+                return_exceptions=True,
+            )
+
+        with span("refresh.apply"):
+            # 1. Individual Zones
+            try:
+                if isinstance(zones, BaseException):
+                    raise zones
+                changed |= self._apply_zone_payload(zones, topology, as_of)
+            except Exception as e:
+                _throttled.error("Failed to refresh zones of %s: %s", self._location_id, str(e), key=self._location_id)
+
+            # 2. Groups
+            try:
+                if isinstance(groups, BaseException):
+                    raise groups
+                changed |= self._apply_group_payload(groups, topology, as_of)
+            except Exception as e:
+                _throttled.error("Failed to refresh groups of %s: %s", self._location_id, str(e), key=self._location_id)
+
+        if isinstance(zones, Exception) and isinstance(groups, Exception):
+            # Nothing came back; let the caller keep serving the last state
+            raise zones
+
+        if topology and not isinstance(zones, Exception) and not isinstance(groups, Exception):
+            self._last_topology_refresh = time.monotonic()
         self._last_refresh = time.time()
+        self.poll_scheduler.record_refresh(bool(changed))
+        return changed
+
+    def _apply_zone_payload(self, response: Any, topology: bool, as_of: Optional[int] = None) -> Set[int]:
+        if not topology:
+            changed = self._apply_zone_states(response, as_of)
+            if changed is not None:
+                return changed
+            logger.debug("Zones of %s changed, refreshing topology", self._location_id)
+        return self._apply_zones(response, as_of)
 
-    def _add_or_update_light(self, data: Dict[str, Any], is_group: bool) -> None:
+    def _apply_group_payload(self, response: Any, topology: bool, as_of: Optional[int] = None) -> Set[int]:
+        if not topology:
+            changed = self._apply_group_states(response, as_of)
+            if changed is not None:
+                return changed
+            logger.debug("Groups of %s changed, refreshing topology", self._location_id)
+        return self._apply_groups(response, as_of)
+
+    def _apply_zone_states(self, response: Any, as_of: Optional[int] = None) -> Optional[Set[int]]:
+        """State tier for zones; None, with nothing applied, if the set of zones is not the known one."""
+        lights = self._lights
+        zone_list = response if isinstance(response, list) else response.get("data", [])
+        # Match every zone before applying any state, so a topology fallback
+        # still sees the changes in this payload
+        matched = []
+        for item in zone_list:
+            if not item.get("isZone"):
+                continue
+            light = lights.get(int(item["id"]))
+            if light is None or light._type == "Group":
+                return None
+            matched.append((light, item))
+        if len(matched) != self._light_counts()[0]:
+            return None
+        changed: Set[int] = set()
+        for light, item in matched:
+            brightness = item.get("lightBrightnessId", item.get("brightnessId", 10))
+            if light.update_state(item.get("isOn", False), brightness, item.get("colorId"), as_of):
+                changed.add(light.id)
+        return changed
+
+    def _apply_group_states(self, response: Any, as_of: Optional[int] = None) -> Optional[Set[int]]:
+        """State tier for groups; None, with nothing applied, if the set of groups is not the known one."""
+        lights = self._lights
+        group_list = response if isinstance(response, list) else response.get("data", [])
+        matched = []
+        for item in group_list:
+            light = lights.get(int(item["groupId"]))
+            if light is None or light._type != "Group":
+                return None
+            matched.append((light, item))
+        if len(matched) != self._light_counts()[1]:
+            return None
+        changed: Set[int] = set()
+        for light, item in matched:
+            if light.update_state(item["isOn"], item.get("brightnessId", 10), item.get("colorId"), as_of):
+                changed.add(light.id)
+        return changed
+
+    def _light_counts(self) -> Tuple[int, int]:
+        """Number of (zones, groups), recounted only when the topology changes."""
+        cached = self._counts
+        if cached is None or cached[0] != self.topology_version:
+            lights = self._lights
+            groups = sum(1 for light in lights.values() if light._type == "Group")
+            cached = self._counts = (self.topology_version, len(lights) - groups, groups)
+        return cached[1], cached[2]
+
+    def _apply_zones(self, response: Any, as_of: Optional[int] = None) -> Set[int]:
+        changed: Set[int] = set()
+        seen: Set[int] = set()
+        lights = dict(self._lights)
+        zone_list = response if isinstance(response, list) else response.get("data", [])
+        for item in zone_list:
+            # CAPTURE THE REAL LOCATION NAME
+            if not self._real_location_name and "locationName" in item:
+                self._real_location_name = item["locationName"]
+                self.topology_version += 1
+
+            if item.get("isZone"):
+                seen.add(int(item["id"]))
+                if self._add_or_update_light(lights, item, is_group=False, as_of=as_of):
+                    changed.add(int(item["id"]))
+        self._prune_lights(lights, is_group=False, keep=seen)
+        self._lights = lights
+        return changed
+
+    def _apply_groups(self, response: Any, as_of: Optional[int] = None) -> Set[int]:
+        changed: Set[int] = set()
+        seen: Set[int] = set()
+        lights = dict(self._lights)
+        group_list = response if isinstance(response, list) else response.get("data", [])
+        group_members: Dict[int, FrozenSet[int]] = {}
+        for item in group_list:
+            members = self._parse_group_members(item)
+            if members:
+                group_members[int(item["groupId"])] = members
+            group_data = {
+                "id": item["groupId"],
+                "name": item["groupName"],
+                "isOn": item["isOn"],
+                "lightBrightnessId": item.get("brightnessId", 10),
+                "colorId": item.get("colorId"),
+                "isZone": False,
+                "type": "Group"
+            }
+            seen.add(int(group_data["id"]))
+            if self._add_or_update_light(lights, group_data, is_group=True, as_of=as_of):
+                changed.add(int(group_data["id"]))
+        self._prune_lights(lights, is_group=True, keep=seen)
+        self._lights = lights
+        self._index_groups(group_members)
+        return changed
+
+    @staticmethod
+    def _parse_group_members(item: Dict[str, Any]) -> FrozenSet[int]:
+        """Extract member zone IDs from a group payload, if it lists them."""
+        members = set()
+        for key in ("lights", "zones", "lightIds", "zoneIds"):
+            for member in item.get(key) or ():
+                if isinstance(member, dict):
+                    member = member.get("lightId", member.get("id"))
+                if member is not None:
+                    members.add(int(member))
+        return frozenset(members)
+
+    def _index_groups(self, group_members: Dict[int, FrozenSet[int]]) -> None:
+        zone_groups: Dict[int, Set[int]] = {}
+        for group_id, members in group_members.items():
+            for zone_id in members:
+                zone_groups.setdefault(zone_id, set()).add(group_id)
+        self._group_members = group_members
+        self._zone_groups = zone_groups
+
+    def _prune_lights(self, lights: Dict[int, Light], is_group: bool, keep: Set[int]) -> None:
+        """Forget zones (or groups) the API no longer returns."""
+        for light_id in [
+            light_id for light_id, light in lights.items()
+            if (light._type == "Group") == is_group and light_id not in keep
+        ]:
+            logger.info("Light %s no longer exists", light_id)
+            del lights[light_id]
+            self.topology_version += 1
+
+    def _add_or_update_light(
+        self,
+        lights: Dict[int, Light],
+        data: Dict[str, Any],
+        is_group: bool,
+        as_of: Optional[int] = None,
+    ) -> bool:
+        """Create or update a light in ``lights``; return True if it is new or changed."""
         light_id = int(data["id"])
         if "type" not in data:
             data["type"] = "Group" if is_group else "Zone"
-            
-        if light_id in self._lights:
-            self._lights[light_id].update_from_data(data)
+
+        if light_id in lights:
+            light = lights[light_id]
+            name = light.name
+            changed = light.update_from_data(data, as_of)
+            if light.name != name:
+                self.topology_version += 1
+            return changed
         else:
             data["lightId"] = light_id
-            self._lights[light_id] = Light(
-                self._credentials, 
-                self._location_id, 
-                light_id, 
+            lights[light_id] = Light(
+                self._credentials,
+                self._location_id,
+                light_id,
                 data
             )
+            self.topology_version += 1
+            return True
 
     def get_lights(self) -> Dict[int, Light]:
         if not self._lights:
             self.refresh_devices()
+        return self._lights
+
+    async def async_get_lights(self) -> Dict[int, Light]:
+        if not self._lights:
+            await self.async_refresh_devices()
         return self._lights
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""Priority dispatch of Haven Lighting API requests."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from .config import MAX_CONCURRENT_REQUESTS
+from .exceptions import TransientApiError
+from .timeouts import POLL, endpoint_class
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first."""
+    # Commands a user is waiting for, and the logins they depend on
+    INTERACTIVE = 0
+    # Refreshes confirming the state shown after recent commands
+    CONFIRM = 1
+    # Periodic polls
+    BACKGROUND = 2
+
+
+def priority_for(method: str, path: str) -> Priority:
+    """Default priority: polls are background work, everything else interactive."""
+    return Priority.BACKGROUND if endpoint_class(method, path) == POLL else Priority.INTERACTIVE
+
+
+class _Superseded(Exception):
+    """Delivered to a queued request replaced by a newer one with its key."""
+
+    def __init__(self, outcome: asyncio.Future) -> None:
+        super().__init__()
+        self.outcome = outcome
+
+
+class _Waiter:
+    __slots__ = ("key", "grant", "outcome", "dropped")
+
+    def __init__(self, key: Optional[Hashable], grant: asyncio.Future) -> None:
+        self.key = key
+        self.grant = grant
+        # Result shared with the requests this one superseded, if any
+        self.outcome: Optional[asyncio.Future] = None
+        self.dropped = False
+
+
+class RequestDispatcher:
+    """Run requests with bounded concurrency, most urgent first.
+
+    Once all slots are busy, requests queue by priority and then by arrival.
+    A queued request with a ``key`` is dropped when another one with the
+    same key is queued; its caller receives the newer request's outcome, so
+    a backlog of polls collapses into one fresh poll per endpoint.
+    """
+
+    def __init__(self, limit: int = MAX_CONCURRENT_REQUESTS) -> None:
+        self._limit = limit
+        self._active = 0
+        self._heap: List[Tuple[int, int, _Waiter]] = []
+        self._keyed: Dict[Hashable, _Waiter] = {}
+        self._arrival = itertools.count()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, waiter in self._heap if not waiter.dropped)
+
+    async def async_run(
+        self,
+        priority: Priority,
+        func: Callable[[], Awaitable[T]],
+        key: Optional[Hashable] = None,
+    ) -> T:
+        """Await ``func()`` once a slot is free for its priority."""
+        waiter = None
+        if self._active < self._limit and not self._heap:
+            self._active += 1
+        else:
+            try:
+                waiter = await self._async_wait(priority, key)
+            except _Superseded as superseded:
+                return await asyncio.shield(superseded.outcome)
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._settle(waiter, error=TransientApiError("Superseding request was cancelled"))
+            raise
+        except Exception as err:
+            self._settle(waiter, error=err)
+            raise
+        else:
+            self._settle(waiter, result=result)
+            return result
+        finally:
+            self._active -= 1
+            self._grant()
+
+    async def _async_wait(self, priority: Priority, key: Optional[Hashable]) -> _Waiter:
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(key, loop.create_future())
+        if key is not None:
+            older = self._keyed.get(key)
+            # One already granted a slot may not have resumed yet; it runs
+            if older is not None and not older.grant.done():
+                older.dropped = True
+                waiter.outcome = older.outcome or loop.create_future()
+                older.grant.set_exception(_Superseded(waiter.outcome))
+            self._keyed[key] = waiter
+        heapq.heappush(self._heap, (priority, next(self._arrival), waiter))
+        self._grant()
+        try:
+            await waiter.grant
+        except asyncio.CancelledError:
+            grant = waiter.grant
+            if grant.done() and not grant.cancelled() and grant.exception() is None:
+                # Granted just before the cancellation; pass the slot on
+                self._active -= 1
+                self._grant()
+            waiter.dropped = True
+            self._settle(waiter, error=TransientApiError("Superseding request was cancelled"))
+            raise
+        finally:
+            if key is not None and self._keyed.get(key) is waiter:
+                del self._keyed[key]
+        return waiter
+
+    def _grant(self) -> None:
+        """Hand free slots to the most urgent live waiters."""
+        while self._active < self._limit and self._heap:
+            *_, waiter = heapq.heappop(self._heap)
+            if waiter.dropped or waiter.grant.done():
+                continue
+            self._active += 1
+            waiter.grant.set_result(None)
+
+    @staticmethod
+    def _settle(waiter: Optional[_Waiter], result: Any = None, error: Optional[BaseException] = None) -> None:
+        outcome = waiter.outcome if waiter is not None else None
+        if outcome is None or outcome.done():
+            return
+        if error is None:
+            outcome.set_result(result)
+        else:
+            outcome.set_exception(error)
+            # Followers may all have given up; do not log it as unretrieved
+            outcome.exception()
@@ -12,6 +12,25 @@ class ApiError(HavenException):
     """Raised when an API request fails."""
     pass
 
+class TransientApiError(ApiError):
+    """Raised for timeouts, connection failures and 5xx responses that may succeed on retry."""
+    pass
+
+class RequestTimeoutError(TransientApiError):
+    """Raised when a call runs out of time, retries included."""
+    pass
+
+class RateLimitError(TransientApiError):
+    """Raised when the API answers 429 Too Many Requests."""
+
+    def __init__(self, message: str, code: Optional[int] = 429, retry_after: Optional[float] = None) -> None:
+        self.retry_after = retry_after
+        super().__init__(message, code)
+
+class CircuitOpenError(ApiError):
+    """Raised without a request while the API is considered down."""
+    pass
+
 class AuthenticationError(HavenException):
     """Raised when authentication fails or is required but missing."""
     pass
@@ -1,29 +1,107 @@
 """Logging configuration for Haven Lighting."""
 
 import logging
-from typing import Optional
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
 
-def setup_logging(level: int = logging.INFO, 
+from .config import LOG_DEBUG_SAMPLE_RATE, LOG_THROTTLE_INTERVAL
+
+# Marks the handlers added by setup_logging, so they are replaced, not stacked
+_HANDLER_TAG = "_haven_handler"
+# Distinct keys remembered by a ThrottledLogger before it starts over
+_MAX_KEYS = 1024
+
+
+def setup_logging(level: int = logging.INFO,
                  log_file: Optional[str] = None) -> None:
     """
     Configure logging for the Haven Lighting client.
-    
+
+    Only for standalone use: when the application already configured logging
+    (the root logger has handlers, as in Home Assistant), nothing is changed.
+    Calling it again replaces the handlers added before instead of adding more.
+
     Args:
         level: Logging level (default: INFO)
         log_file: Optional file path for logging output
     """
-    logger = logging.getLogger("havenlighting")
+    if logging.getLogger().handlers:
+        return
+
+    logger = logging.getLogger(__package__)
     logger.setLevel(level)
-    
+
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
-    
+
+    for handler in [h for h in logger.handlers if getattr(h, _HANDLER_TAG, False)]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
     if log_file:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler) 
\ No newline at end of file
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        setattr(handler, _HANDLER_TAG, True)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+
+class ThrottledLogger:
+    """Logger wrapper for hot paths.
+
+    Messages with the same key (the format string unless given) are written
+    at most once per ``interval``; the next one that gets through reports how
+    many were suppressed. Debug messages are sampled, one in ``sample_rate``.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval: float = LOG_THROTTLE_INTERVAL,
+        sample_rate: int = LOG_DEBUG_SAMPLE_RATE,
+    ) -> None:
+        self._logger = logger
+        self._interval = interval
+        self._sample_rate = sample_rate
+        # key -> [earliest time the next message may be written, suppressed]
+        self._throttled: Dict[Hashable, List[Any]] = {}
+        self._sampled: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def error(self, msg: str, *args: Any, key: Optional[Hashable] = None) -> None:
+        self._log(logging.ERROR, msg, args, key)
+
+    def warning(self, msg: str, *args: Any, key: Optional[Hashable] = None) -> None:
+        self._log(logging.WARNING, msg, args, key)
+
+    def debug(self, msg: str, *args: Any) -> None:
+        """Write every ``sample_rate``-th debug message of this format."""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        with self._lock:
+            seen = self._sampled.get(msg, 0)
+            self._sampled[msg] = seen + 1
+        if seen % self._sample_rate == 0:
+            self._logger.debug(msg, *args)
+
+    def _log(self, level: int, msg: str, args: tuple, key: Optional[Hashable]) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        key = (msg, key)
+        now = time.monotonic()
+        with self._lock:
+            state = self._throttled.get(key)
+            if state is not None and now < state[0]:
+                state[1] += 1
+                return
+            suppressed = state[1] if state is not None else 0
+            if state is None and len(self._throttled) >= _MAX_KEYS:
+                self._throttled.clear()
+            self._throttled[key] = [now + self._interval, 0]
+        if suppressed:
+            msg += " (%d similar messages suppressed)"
+            args += (suppressed,)
+        self._logger.log(level, msg, *args)
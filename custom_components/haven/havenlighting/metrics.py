@@ -0,0 +1,153 @@
+"""Per-endpoint request counters and latency histograms for the Haven API."""
+
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .config import METRICS_BUCKET_GROWTH, METRICS_BUCKET_MAX, METRICS_BUCKET_MIN
+from .exceptions import AuthenticationError, HavenException
+
+
+def _bucket_bounds() -> List[float]:
+    bounds = []
+    bound = METRICS_BUCKET_MIN
+    while bound < METRICS_BUCKET_MAX:
+        bounds.append(bound)
+        bound *= METRICS_BUCKET_GROWTH
+    bounds.append(METRICS_BUCKET_MAX)
+    return bounds
+
+
+# Upper bounds (seconds) shared by every histogram; one overflow bucket follows
+BUCKET_BOUNDS = _bucket_bounds()
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+@lru_cache(maxsize=256)
+def endpoint_of(path: str) -> str:
+    """Group paths by endpoint: numeric IDs are replaced by ``{id}``."""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets: constant memory, quantiles within one bucket."""
+
+    __slots__ = ("counts", "total", "sum", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-th quantile in seconds, interpolated in its bucket."""
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(BUCKET_BOUNDS):
+                    return self.max
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                estimate = lower + (BUCKET_BOUNDS[index] - lower) * (rank - seen) / count
+                return min(estimate, self.max)
+            seen += count
+        return self.max
+
+
+class EndpointStats:
+    """Counters and latency of one endpoint."""
+
+    __slots__ = ("count", "errors", "unauthorized", "latency")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.unauthorized = 0
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: "EndpointStats") -> None:
+        self.count += other.count
+        self.errors += other.errors
+        self.unauthorized += other.unauthorized
+        self.latency.merge(other.latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        latency = self.latency
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "unauthorized": self.unauthorized,
+            "mean_ms": ms(latency.sum / latency.total) if latency.total else None,
+            "p50_ms": ms(latency.quantile(0.5)),
+            "p95_ms": ms(latency.quantile(0.95)),
+            "p99_ms": ms(latency.quantile(0.99)),
+            "max_ms": ms(latency.max) if latency.total else None,
+        }
+
+
+class RequestMetrics:
+    """Per-endpoint request statistics of one account.
+
+    Recording is a cached path lookup, a bisect and a few increments, so it
+    stays on in production. Every attempt counts, retries included.
+    """
+
+    def __init__(self) -> None:
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float, error: Optional[HavenException] = None) -> None:
+        endpoint = endpoint_of(path)
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.count += 1
+            stats.latency.record(seconds)
+            if error is not None:
+                stats.errors += 1
+                if isinstance(error, AuthenticationError):
+                    stats.unauthorized += 1
+
+    def total(self) -> EndpointStats:
+        """All endpoints combined."""
+        total = EndpointStats()
+        with self._lock:
+            for stats in self._endpoints.values():
+                total.merge(stats)
+        return total
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            endpoints = {endpoint: stats.as_dict() for endpoint, stats in self._endpoints.items()}
+        endpoints["total"] = self.total().as_dict()
+        return endpoints
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
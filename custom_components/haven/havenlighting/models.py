@@ -1,19 +1,32 @@
+import itertools
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+# Orders state writes and the requests behind them; next() on a count is
+# atomic in CPython, so threads and tasks may draw from it concurrently
+_sequence = itertools.count(1)
+
+def next_sequence() -> int:
+    """Return a number greater than every one returned before."""
+    return next(_sequence)
+
+@dataclass(frozen=True, slots=True)
 class LightData:
-    """Data model for light attributes."""
+    """Immutable snapshot of light attributes.
+
+    ``seq`` is the sequence number of the write that produced it.
+    """
     light_id: int
     name: str
     status: int
     brightness: int = 63
     color: int = 63
     pattern_speed: int = 63
+    seq: int = 0
 
 @dataclass
 class LocationData:
     """Data model for location attributes."""
     location_id: int
     name: str
-    owner_name: Optional[str] = None 
\ No newline at end of file
+    owner_name: Optional[str] = None
@@ -0,0 +1,85 @@
+"""Timing spans around the client's refresh, command and auth phases.
+
+Spans are only measured while a recording is active. Otherwise ``span()``
+returns a shared no-op context manager, so the instrumentation can stay in
+the hot paths.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Any, ContextManager, Dict, Iterator, Optional
+
+from .metrics import LatencyHistogram
+
+_NULL_SPAN: ContextManager[None] = contextlib.nullcontext()
+
+
+class SpanRecorder:
+    """Wall-clock duration of every named span, aggregated per name."""
+
+    def __init__(self) -> None:
+        self._spans: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._spans.get(name)
+            if histogram is None:
+                histogram = self._spans[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 2)
+
+        with self._lock:
+            return {
+                name: {
+                    "count": histogram.total,
+                    "total_ms": ms(histogram.sum),
+                    "mean_ms": ms(histogram.sum / histogram.total),
+                    "p50_ms": ms(histogram.quantile(0.5)),
+                    "p95_ms": ms(histogram.quantile(0.95)),
+                    "max_ms": ms(histogram.max),
+                }
+                for name, histogram in sorted(self._spans.items())
+            }
+
+
+_recorder: Optional[SpanRecorder] = None
+
+
+def span(name: str) -> ContextManager[None]:
+    """Time the enclosed block under ``name`` if a recording is active."""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return recorder.span(name)
+
+
+def start_recording() -> SpanRecorder:
+    """Start collecting spans process-wide; raises if already recording."""
+    global _recorder
+    if _recorder is not None:
+        raise RuntimeError("Span recording already active")
+    _recorder = SpanRecorder()
+    return _recorder
+
+
+def stop_recording() -> Optional[SpanRecorder]:
+    """Stop collecting spans and return what was recorded."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
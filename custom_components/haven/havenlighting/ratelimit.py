@@ -0,0 +1,112 @@
+"""Request pacing and retry accounting for the Haven Lighting API."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from .config import (
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    RETRY_BUDGET_MIN,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_WINDOW,
+)
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by the threaded and async paths."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def async_acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class RetryBudget:
+    """Caps retries to a share of recent traffic.
+
+    Within each window retries may not exceed ``ratio`` of first attempts
+    (plus a small floor for quiet periods), so an outage cannot turn into
+    a retry storm.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        minimum: int = RETRY_BUDGET_MIN,
+        window: float = RETRY_BUDGET_WINDOW,
+    ) -> None:
+        self._ratio = ratio
+        self._minimum = minimum
+        self._window = window
+        self._started = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+        self._lock = threading.Lock()
+
+    def _roll(self) -> None:
+        now = time.monotonic()
+        if now - self._started >= self._window:
+            self._started = now
+            self._requests = 0
+            self._retries = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._roll()
+            self._requests += 1
+
+    def try_spend(self) -> bool:
+        """Account for a retry; False when the budget is exhausted."""
+        with self._lock:
+            self._roll()
+            if self._retries >= self._minimum + self._ratio * self._requests:
+                return False
+            self._retries += 1
+            return True
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BACKOFF_BASE, cap: float = RETRY_BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for the given retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, if any."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
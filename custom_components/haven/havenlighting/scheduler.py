@@ -0,0 +1,57 @@
+"""Activity-driven polling intervals for Haven locations."""
+
+from __future__ import annotations
+
+import time
+
+from .config import (
+    POLL_ACTIVE_PERIOD,
+    POLL_BACKOFF_FACTOR,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+)
+
+class AdaptivePollScheduler:
+    """Poll fast right after activity and back off while nothing changes.
+
+    Any command or detected state change resets the interval to the minimum
+    for ``active_period`` seconds. After that, every refresh that finds no
+    change multiplies the interval by ``backoff`` up to the maximum.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+        active_period: float = POLL_ACTIVE_PERIOD,
+        backoff: float = POLL_BACKOFF_FACTOR,
+    ) -> None:
+        self._active_period = active_period
+        self._backoff = backoff
+        self._interval = float(min_interval)
+        self._active_until = 0.0
+        self.configure(min_interval, max_interval)
+        self.note_activity()
+
+    def configure(self, min_interval: float, max_interval: float) -> None:
+        """Change the interval bounds, keeping the current interval inside them."""
+        self.min_interval = float(min_interval)
+        self.max_interval = max(float(max_interval), self.min_interval)
+        self._interval = min(max(self._interval, self.min_interval), self.max_interval)
+
+    @property
+    def interval(self) -> float:
+        """Seconds until the next poll should run."""
+        return self._interval
+
+    def note_activity(self) -> None:
+        """Something happened (command, change); poll quickly for a while."""
+        self._active_until = time.monotonic() + self._active_period
+        self._interval = self.min_interval
+
+    def record_refresh(self, changed: bool) -> None:
+        """Adjust the interval after a refresh that did or did not find changes."""
+        if changed:
+            self.note_activity()
+        elif time.monotonic() >= self._active_until:
+            self._interval = min(self.max_interval, self._interval * self._backoff)
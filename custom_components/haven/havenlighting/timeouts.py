@@ -0,0 +1,74 @@
+"""Per-phase timeouts and call deadlines for the Haven Lighting API."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, NamedTuple, Optional
+
+from .config import REQUEST_TIMEOUTS
+from .exceptions import RequestTimeoutError
+
+AUTH = "auth"
+POLL = "poll"
+COMMAND = "command"
+
+
+class RequestTimeout(NamedTuple):
+    """Seconds allowed to connect, between reads, and for the whole call."""
+    connect: float
+    read: float
+    total: float
+
+
+def endpoint_class(method: str, path: str) -> str:
+    """Classify a request as auth, poll (reads) or command (writes)."""
+    if path.startswith("/Auth/"):
+        return AUTH
+    return POLL if method.upper() == "GET" else COMMAND
+
+
+def timeout_for(method: str, path: str) -> RequestTimeout:
+    return RequestTimeout(*REQUEST_TIMEOUTS[endpoint_class(method, path)])
+
+
+class Deadline:
+    """Point in time by which a call, retries and token refresh included, must end."""
+
+    __slots__ = ("path", "expires")
+
+    def __init__(self, path: str, seconds: float) -> None:
+        self.path = path
+        self.expires = time.monotonic() + seconds
+
+    @classmethod
+    def for_request(cls, method: str, path: str, total: Optional[float] = None) -> "Deadline":
+        """The endpoint class's deadline, or ``total`` seconds if given."""
+        return cls(path, timeout_for(method, path).total if total is None else total)
+
+    def remaining(self) -> float:
+        """Seconds left; raises RequestTimeoutError once none are."""
+        left = self.expires - time.monotonic()
+        if left <= 0:
+            raise RequestTimeoutError(f"Deadline exceeded for {self.path}")
+        return left
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def allows(self, delay: float) -> bool:
+        """True if waiting ``delay`` seconds still leaves time for a request."""
+        return self.expires - time.monotonic() > delay
+
+
+@contextlib.asynccontextmanager
+async def enforce(deadline: Deadline) -> AsyncIterator[None]:
+    """Cancel the enclosed block, and its in-flight request, once ``deadline`` passes."""
+    remaining = deadline.remaining()
+    try:
+        async with asyncio.timeout(remaining):
+            yield
+    except TimeoutError as err:
+        raise RequestTimeoutError(f"Deadline exceeded for {deadline.path}") from err
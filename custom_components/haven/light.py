@@ -1,7 +1,7 @@
 """Platform for Haven light integration."""
 from __future__ import annotations
 import logging
-import math
+from collections.abc import Mapping
 from typing import Any
 
 from homeassistant.components.light import (
@@ -9,124 +9,104 @@ from homeassistant.components.light import (
     ATTR_RGB_COLOR,
     ATTR_COLOR_TEMP_KELVIN,
     ATTR_EFFECT,
+    ATTR_HS_COLOR,
+    ATTR_XY_COLOR,
     ColorMode,
     LightEntity,
     LightEntityFeature,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import entity_registry as er
-from homeassistant.helpers import device_registry as dr
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .havenlighting import HavenClient
-from . import DOMAIN
+from .const import (
+    ATTR_LAST_SUCCESSFUL_UPDATE,
+    ATTR_STALE,
+    DOMAIN,
+    SIGNAL_TOPOLOGY_UPDATED,
+)
+from .havenlighting import CommandIntent, LightCommandQueue
+from .havenlighting.colors import (
+    HAVEN_EFFECT_MAP,
+    closest_color_id,
+    closest_color_id_hs,
+    closest_color_id_xy,
+    closest_kelvin_id,
+)
+from .coordinator import HavenLocationCoordinator
+from .models import HavenData
+from .reconcile import MODEL_BY_ROLE, light_role, light_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
-# --- MAPPING TABLES ---
-
-HAVEN_KELVIN_MAP = {
-    2700: 1, 3000: 2, 3500: 3, 3700: 4,
-    4000: 5, 4100: 6, 4700: 7, 5000: 8,
-}
-
-HAVEN_RGB_MAP = {
-    (255, 0, 0): 11,      # Red
-    (255, 100, 0): 13,    # Pumpkin
-    (255, 191, 0): 14,    # Amber
-    (255, 128, 0): 15,    # Tangerine
-    (255, 215, 0): 16,    # Marigold
-    (255, 255, 0): 18,    # Yellow
-    (191, 255, 0): 19,    # Lime
-    (128, 255, 0): 20,    # Light Green
-    (0, 255, 0): 21,      # Green
-    (0, 255, 128): 22,    # Sea Foam
-    (64, 224, 208): 23,   # Turquoise
-    (0, 0, 255): 25,      # Deep Blue
-    (127, 0, 255): 26,    # Violet
-    (128, 0, 128): 27,    # Purple
-    (230, 230, 250): 28,  # Lavender
-    (255, 192, 203): 29,  # Pink
-    (255, 105, 180): 30,  # Hot Pink
-}
-
-HAVEN_EFFECT_MAP = {
-    "Fire": 12,
-    "Sunset": 17,
-    "Ocean": 24
-}
-
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Haven Light from a config entry."""
-    client: HavenClient = hass.data[DOMAIN][config_entry.entry_id]
-    
-    locations = await hass.async_add_executor_job(client.discover_locations)
-    if not locations:
-        return
-        
-    # FIX 2: Register the "Location" device first to stop the "via_device" warning
-    device_registry = dr.async_get(hass)
-    for loc_id, location in locations.items():
-        device_registry.async_get_or_create(
-            config_entry_id=config_entry.entry_id,
-            identifiers={(DOMAIN, str(loc_id))},
-            manufacturer="Haven",
-            name=location.name,
-            model="Haven Controller/Location",
+    data: HavenData = hass.data[DOMAIN][config_entry.entry_id]
+    known: set[int] = set()
+
+    @callback
+    def _async_add_new_lights() -> None:
+        """Add entities for zones and groups that have none yet."""
+        entities = []
+        current: set[int] = set()
+        for coordinator in data.coordinators.values():
+            for light_id, light in coordinator.location.lights.items():
+                current.add(light_id)
+                if light_id not in known:
+                    entities.append(HavenLight(coordinator, light))
+        # Removed lights lose their entity through the registry; forget them
+        # so they are added again if they come back
+        known.intersection_update(current)
+        known.update(entity.light_id for entity in entities)
+        if entities:
+            async_add_entities(entities)
+
+    # Lights are known here either from the first refresh or from the
+    # stored topology, so no API call is needed to create the entities
+    _async_add_new_lights()
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_TOPOLOGY_UPDATED.format(config_entry.entry_id),
+            _async_add_new_lights,
         )
+    )
 
-    entities = []
-    found_entity_ids = set()
-    found_device_ids = set()
+def turn_on_intent(kwargs: Mapping[str, Any]) -> CommandIntent:
+    """Translate light.turn_on attributes to a Haven command intent."""
+    brightness = None
+    color = None
 
-    for loc_key, location in locations.items():
-        lights = await hass.async_add_executor_job(location.get_lights)
-        if lights:
-            for light in lights.values():
-                entity = HavenLight(light, location)
-                entities.append(entity)
-                found_entity_ids.add(entity.unique_id)
-                found_device_ids.add(str(light.id))
+    if ATTR_BRIGHTNESS in kwargs:
+        ha_brightness = kwargs[ATTR_BRIGHTNESS]
+        brightness = round(ha_brightness / 25.5)
+        if brightness == 0: brightness = 1
 
-    async_add_entities(entities)
-    
-    await _async_cleanup_dead_items(hass, config_entry, found_entity_ids, found_device_ids)
-
-async def _async_cleanup_dead_items(hass: HomeAssistant, config_entry: ConfigEntry, found_entity_ids: set[str], found_device_ids: set[str]):
-    """Remove entities and devices that are no longer returned by the API."""
-    ent_reg = er.async_get(hass)
-    entries = er.async_entries_for_config_entry(ent_reg, config_entry.entry_id)
-    for entry in entries:
-        if entry.unique_id not in found_entity_ids:
-            _LOGGER.info("Removing dead entity: %s", entry.entity_id)
-            ent_reg.async_remove(entry.entity_id)
-
-    dev_reg = dr.async_get(hass)
-    devices = dr.async_entries_for_config_entry(dev_reg, config_entry.entry_id)
-    for device in devices:
-        # Skip the Location device (it won't be in the light list)
-        is_location = False
-        for domain, device_id in device.identifiers:
-             if domain == DOMAIN and device_id not in found_device_ids:
-                 # Crude check: if the ID is short (5 digits like 28513) it's likely the location, keep it.
-                 # Lights are usually longer (6 digits like 801348 or 79633)
-                 if len(str(device_id)) < 6: 
-                     is_location = True
-                     continue
-                 
-                 if not is_location:
-                    _LOGGER.info("Removing dead device: %s", device_id)
-                    dev_reg.async_remove_device(device.id)
-                    break
-
-class HavenLight(LightEntity):
-    """Representation of a Haven Light."""
+    if ATTR_EFFECT in kwargs and kwargs[ATTR_EFFECT] in HAVEN_EFFECT_MAP:
+        color = HAVEN_EFFECT_MAP[kwargs[ATTR_EFFECT]]
+    elif ATTR_COLOR_TEMP_KELVIN in kwargs:
+        color = closest_kelvin_id(kwargs[ATTR_COLOR_TEMP_KELVIN])
+    elif ATTR_RGB_COLOR in kwargs:
+        color = closest_color_id(*kwargs[ATTR_RGB_COLOR])
+    elif ATTR_HS_COLOR in kwargs:
+        color = closest_color_id_hs(*kwargs[ATTR_HS_COLOR])
+    elif ATTR_XY_COLOR in kwargs:
+        color = closest_color_id_xy(*kwargs[ATTR_XY_COLOR])
+
+    return CommandIntent(on=True, brightness=brightness, color=color)
+
+class HavenLight(CoordinatorEntity[HavenLocationCoordinator], LightEntity):
+    """Representation of a Haven Light.
+
+    State is pushed by the location coordinator, so the entity never polls.
+    """
 
     _attr_has_entity_name = True
     
@@ -138,18 +118,28 @@ class HavenLight(LightEntity):
     _attr_min_color_temp_kelvin = 2700
     _attr_max_color_temp_kelvin = 5000
 
-    def __init__(self, light, location) -> None:
+    def __init__(self, coordinator: HavenLocationCoordinator, light) -> None:
         """Initialize a Haven Light."""
+        super().__init__(coordinator)
         self._light = light
-        self._location = location
-        self._attr_unique_id = f"haven_light_{light.id}"
-        self._attr_name = light.name
+        location = coordinator.location
+        # Merges rapid commands, hands them to the location's group planner
+        # and has the location refreshed shortly after they are sent
+        self._commands = LightCommandQueue(
+            light,
+            on_drain=coordinator.async_request_confirmation,
+            dispatch=location.planner.async_dispatch,
+        )
+        self._last_update_success = coordinator.last_update_success
+        # Entities restored from the topology snapshot start unavailable
+        self._available = self.available
+        self._attr_unique_id = light_unique_id(light.id)
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, str(light.id))},
             name=light.name,
             manufacturer="Haven",
-            model=f"Haven {light._type}",
-            # Now safe to reference because we created it in setup
+            model=MODEL_BY_ROLE[light_role(light)],
+            # The reconciler creates location devices before any light
             via_device=(DOMAIN, str(location._location_id)),
         )
 
@@ -157,6 +147,43 @@ class HavenLight(LightEntity):
     def unique_id(self) -> str:
         return self._attr_unique_id
 
+    @property
+    def light_id(self) -> int:
+        return self._light.id
+
+    @property
+    def name(self) -> str:
+        # Follows renames picked up by refreshes
+        return self._light.name
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if this light changed, the API health flipped or it became available."""
+        update_success = self.coordinator.last_update_success
+        available = self.available
+        if (
+            update_success != self._last_update_success
+            or available != self._available
+            or (update_success and self._light.id in self.coordinator.data)
+        ):
+            self._last_update_success = update_success
+            self._available = available
+            self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        # Keep the last known state during outages instead of going unavailable
+        return self.coordinator.last_success is not None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        if self.coordinator.last_update_success or self.coordinator.last_success is None:
+            return None
+        return {
+            ATTR_STALE: True,
+            ATTR_LAST_SUCCESSFUL_UPDATE: self.coordinator.last_success.isoformat(),
+        }
+
     @property
     def is_on(self) -> bool:
         return self._light.is_on
@@ -174,51 +201,17 @@ class HavenLight(LightEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the light on."""
-        
-        if ATTR_BRIGHTNESS in kwargs:
-            ha_brightness = kwargs[ATTR_BRIGHTNESS]
-            haven_brightness = round(ha_brightness / 25.5)
-            if haven_brightness == 0: haven_brightness = 1
-            await self.hass.async_add_executor_job(self._light.set_brightness, haven_brightness)
-
-        if ATTR_EFFECT in kwargs:
-            effect_name = kwargs[ATTR_EFFECT]
-            if effect_name in HAVEN_EFFECT_MAP:
-                await self.hass.async_add_executor_job(self._light.set_color, HAVEN_EFFECT_MAP[effect_name])
-                return
-
-        if ATTR_COLOR_TEMP_KELVIN in kwargs:
-            kelvin = kwargs[ATTR_COLOR_TEMP_KELVIN]
-            closest_id = min(HAVEN_KELVIN_MAP.items(), key=lambda x: abs(x[0] - kelvin))[1]
-            await self.hass.async_add_executor_job(self._light.set_color, closest_id)
-            return
-
-        if ATTR_RGB_COLOR in kwargs:
-            r, g, b = kwargs[ATTR_RGB_COLOR]
-            closest_id = self._find_closest_color_id(r, g, b)
-            await self.hass.async_add_executor_job(self._light.set_color, closest_id)
-            return
-
-        if not kwargs:
-            await self.hass.async_add_executor_job(self._light.turn_on)
-        
-        await self.async_update()
+        await self._async_command(turn_on_intent(kwargs))
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the light off."""
-        await self.hass.async_add_executor_job(self._light.turn_off)
-        await self.async_update()
-
-    async def async_update(self) -> None:
-        """Fetch new state data for this light."""
-        await self.hass.async_add_executor_job(self._location.refresh_devices, True)
-
-    def _find_closest_color_id(self, r, g, b):
-        closest_dist = float('inf')
-        closest_id = 24 
-        for color_rgb, color_id in HAVEN_RGB_MAP.items():
-            dist = math.sqrt((r - color_rgb[0]) ** 2 + (g - color_rgb[1]) ** 2 + (b - color_rgb[2]) ** 2)
-            if dist < closest_dist:
-                closest_dist = dist
-                closest_id = color_id
-        return closest_id
\ No newline at end of file
+        await self._async_command(CommandIntent(on=False))
+
+    async def _async_command(self, intent: CommandIntent) -> None:
+        # Show the commanded state right away; the coordinator confirms it
+        # in the background and reverts it if Haven disagrees
+        self._light.expect(intent)
+        self.async_write_ha_state()
+        await self._commands.async_submit(intent)
+        # Command responses may have reported a different state
+        self.async_write_ha_state()
@@ -0,0 +1,17 @@
+"""Runtime data for the Haven Lighting integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .coordinator import HavenLocationCoordinator
+from .havenlighting import HavenClient
+from .reconcile import HavenRegistryReconciler
+
+
+@dataclass
+class HavenData:
+    """Objects shared by the platforms of a config entry."""
+
+    client: HavenClient
+    reconciler: HavenRegistryReconciler
+    coordinators: dict[int, HavenLocationCoordinator] = field(default_factory=dict)
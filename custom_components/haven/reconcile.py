@@ -0,0 +1,193 @@
+"""Keep the device registry in step with the Haven topology."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.light import DOMAIN as LIGHT_DOMAIN
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import DOMAIN, SIGNAL_TOPOLOGY_UPDATED
+from .havenlighting import HavenClient, Location
+from .topology import HavenTopologyStore
+
+_LOGGER = logging.getLogger(__name__)
+
+ROLE_LOCATION = "location"
+ROLE_ZONE = "zone"
+ROLE_GROUP = "group"
+
+# The role of a device is kept in its registry model, so it can be read back
+# without guessing from the shape of the ID
+MODEL_BY_ROLE = {
+    ROLE_LOCATION: "Haven Controller/Location",
+    ROLE_ZONE: "Haven Zone",
+    ROLE_GROUP: "Haven Group",
+}
+ROLE_BY_MODEL = {model: role for role, model in MODEL_BY_ROLE.items()}
+
+
+def light_role(light) -> str:
+    """Registry role of a zone or group."""
+    return ROLE_GROUP if light._type == "Group" else ROLE_ZONE
+
+
+def light_unique_id(light_id: int | str) -> str:
+    """Unique ID of the light entity of a zone or group."""
+    return f"haven_light_{light_id}"
+
+
+def light_id_from_unique_id(unique_id: str) -> int | None:
+    """Haven ID of a light entity's unique ID, or None for other entities."""
+    prefix, _, light_id = unique_id.rpartition("_")
+    if prefix != "haven_light" or not light_id.isdigit():
+        return None
+    return int(light_id)
+
+
+@dataclass(frozen=True, slots=True)
+class TopologyNode:
+    """One device of the topology: what it is and what it is called."""
+
+    role: str | None
+    name: str | None
+
+
+# Keyed by the device identifier, the Haven ID as a string
+Topology = dict[str, TopologyNode]
+
+
+@dataclass(slots=True)
+class TopologyDiff:
+    """Devices to add, remove and update to get from one topology to the next."""
+
+    added: set[str]
+    removed: set[str]
+    # Renamed, or recorded with the wrong role
+    updated: set[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.updated)
+
+
+def topology_from_locations(locations: dict[int, Location]) -> Topology:
+    """Topology of the discovered (or restored) locations."""
+    topology: Topology = {}
+    for loc_id, location in locations.items():
+        topology[str(loc_id)] = TopologyNode(ROLE_LOCATION, location.name)
+        for light in location.lights.values():
+            topology[str(light.id)] = TopologyNode(light_role(light), light.name)
+    return topology
+
+
+@callback
+def async_topology_from_registry(hass: HomeAssistant, entry: ConfigEntry) -> Topology:
+    """Topology as currently recorded in the device registry."""
+    topology: Topology = {}
+    for device in dr.async_entries_for_config_entry(dr.async_get(hass), entry.entry_id):
+        if device.entry_type is dr.DeviceEntryType.SERVICE:
+            # The account device holding the diagnostic sensors
+            continue
+        for domain, device_id in device.identifiers:
+            if domain == DOMAIN:
+                topology[device_id] = TopologyNode(ROLE_BY_MODEL.get(device.model), device.name)
+    return topology
+
+
+def diff_topology(previous: Topology, current: Topology) -> TopologyDiff:
+    """Compare two topologies by device ID."""
+    return TopologyDiff(
+        added=current.keys() - previous.keys(),
+        removed=previous.keys() - current.keys(),
+        updated={
+            device_id for device_id in previous.keys() & current.keys()
+            if previous[device_id] != current[device_id]
+        },
+    )
+
+
+class HavenRegistryReconciler:
+    """Apply topology changes to the device and entity registries.
+
+    Only the difference to the previously applied topology is written, and
+    every registry access is an indexed lookup by identifier or unique ID.
+    Light entities for new zones are created by the light platform when it
+    receives SIGNAL_TOPOLOGY_UPDATED, so no reload is needed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        client: HavenClient,
+        store: HavenTopologyStore,
+        previous: Topology,
+    ) -> None:
+        """Initialize the reconciler with the topology the registry reflects."""
+        self._hass = hass
+        self._entry = entry
+        self._client = client
+        self._store = store
+        self._topology = previous
+
+    @callback
+    def async_schedule(self) -> None:
+        """Reconcile in the background, e.g. after a refresh found new zones."""
+        self._entry.async_create_background_task(
+            self._hass, self.async_reconcile(), f"{DOMAIN} {self._entry.title} reconcile"
+        )
+
+    async def async_reconcile(self) -> None:
+        """Bring the registries in line with the client's current locations."""
+        current = topology_from_locations(self._client.locations)
+        diff = diff_topology(self._topology, current)
+        if not diff:
+            return
+        _LOGGER.debug(
+            "Haven topology changed: %d added, %d removed, %d updated",
+            len(diff.added), len(diff.removed), len(diff.updated),
+        )
+        self._async_apply(current, diff)
+        self._topology = current
+        if diff.added:
+            async_dispatcher_send(self._hass, SIGNAL_TOPOLOGY_UPDATED.format(self._entry.entry_id))
+        await self._store.async_save(self._client.snapshot_locations())
+
+    @callback
+    def _async_apply(self, current: Topology, diff: TopologyDiff) -> None:
+        dev_reg = dr.async_get(self._hass)
+        ent_reg = er.async_get(self._hass)
+
+        for device_id in diff.removed:
+            if entity_id := ent_reg.async_get_entity_id(
+                LIGHT_DOMAIN, DOMAIN, light_unique_id(device_id)
+            ):
+                _LOGGER.info("Removing dead entity: %s", entity_id)
+                ent_reg.async_remove(entity_id)
+            if device := dev_reg.async_get_device(identifiers={(DOMAIN, device_id)}):
+                _LOGGER.info("Removing dead device: %s", device_id)
+                dev_reg.async_remove_device(device.id)
+
+        # Lights reference their location through via_device, so the location
+        # devices exist before the light platform adds any new entities
+        for device_id in diff.added:
+            node = current[device_id]
+            if node.role == ROLE_LOCATION:
+                dev_reg.async_get_or_create(
+                    config_entry_id=self._entry.entry_id,
+                    identifiers={(DOMAIN, device_id)},
+                    manufacturer="Haven",
+                    name=node.name,
+                    model=MODEL_BY_ROLE[ROLE_LOCATION],
+                )
+
+        for device_id in diff.updated:
+            node = current[device_id]
+            if device := dev_reg.async_get_device(identifiers={(DOMAIN, device_id)}):
+                dev_reg.async_update_device(
+                    device.id, name=node.name, model=MODEL_BY_ROLE[node.role]
+                )
@@ -0,0 +1,111 @@
+"""Diagnostic sensors for the Haven Lighting API traffic."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+
+from .const import DOMAIN
+from .havenlighting.metrics import EndpointStats
+from .models import HavenData
+
+# Reads in-memory counters only; no API traffic
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HavenSensorEntityDescription(SensorEntityDescription):
+    """Describes a Haven API traffic sensor."""
+
+    value_fn: Callable[[EndpointStats], StateType]
+
+
+SENSORS: tuple[HavenSensorEntityDescription, ...] = (
+    HavenSensorEntityDescription(
+        key="api_requests",
+        name="API requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.count,
+    ),
+    HavenSensorEntityDescription(
+        key="api_errors",
+        name="API errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.errors,
+    ),
+    HavenSensorEntityDescription(
+        key="api_latency_p50",
+        name="API latency p50",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _ms(stats.latency.quantile(0.5)),
+    ),
+    HavenSensorEntityDescription(
+        key="api_latency_p95",
+        name="API latency p95",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _ms(stats.latency.quantile(0.95)),
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the Haven diagnostic sensors from a config entry."""
+    data: HavenData = hass.data[DOMAIN][config_entry.entry_id]
+    async_add_entities(
+        HavenApiSensor(data, config_entry, description) for description in SENSORS
+    )
+
+
+class HavenApiSensor(SensorEntity):
+    """Account-wide API traffic, off by default."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    entity_description: HavenSensorEntityDescription
+
+    def __init__(
+        self,
+        data: HavenData,
+        config_entry: ConfigEntry,
+        description: HavenSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._metrics = data.client.metrics
+        self._attr_unique_id = f"{config_entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, config_entry.entry_id)},
+            name=config_entry.title,
+            manufacturer="Haven",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        return self.entity_description.value_fn(self._metrics.total())
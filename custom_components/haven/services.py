@@ -0,0 +1,272 @@
+"""Services for the Haven Lighting integration."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+from dataclasses import replace
+import io
+import json
+import logging
+import pstats
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components.light import (
+    ATTR_BRIGHTNESS,
+    ATTR_COLOR_TEMP_KELVIN,
+    ATTR_EFFECT,
+    ATTR_HS_COLOR,
+    ATTR_RGB_COLOR,
+    ATTR_XY_COLOR,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_STATE, STATE_OFF, STATE_ON
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_COLOR_ID,
+    ATTR_DURATION,
+    ATTR_ENTITIES,
+    ATTR_SCENE_ID,
+    DEFAULT_PROFILE_DURATION,
+    DOMAIN,
+    MAX_PROFILE_DURATION,
+    SERVICE_APPLY_SCENE,
+    SERVICE_CAPTURE_SCENE,
+    SERVICE_PROFILE,
+)
+from .coordinator import HavenLocationCoordinator
+from .havenlighting import CommandIntent
+from .havenlighting.profiling import SpanRecorder, start_recording, stop_recording
+from .light import turn_on_intent
+from .models import HavenData
+from .reconcile import light_id_from_unique_id
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=MAX_PROFILE_DURATION)
+        ),
+    }
+)
+
+SCENE_STATE_SCHEMA = vol.Any(
+    vol.All(cv.boolean, lambda on: {ATTR_STATE: on}),
+    vol.Schema(
+        {
+            vol.Required(ATTR_STATE): cv.boolean,
+            vol.Optional(ATTR_BRIGHTNESS): vol.All(vol.Coerce(int), vol.Range(min=0, max=255)),
+            vol.Optional(ATTR_COLOR_TEMP_KELVIN): cv.positive_int,
+            vol.Optional(ATTR_RGB_COLOR): vol.All(
+                vol.ExactSequence((cv.byte,) * 3), vol.Coerce(tuple)
+            ),
+            vol.Optional(ATTR_HS_COLOR): vol.All(
+                vol.ExactSequence((vol.Coerce(float),) * 2), vol.Coerce(tuple)
+            ),
+            vol.Optional(ATTR_XY_COLOR): vol.All(
+                vol.ExactSequence((vol.Coerce(float),) * 2), vol.Coerce(tuple)
+            ),
+            vol.Optional(ATTR_EFFECT): cv.string,
+            # Haven's own color or effect ID, as returned by capture_scene
+            vol.Optional(ATTR_COLOR_ID): vol.Coerce(int),
+        }
+    ),
+)
+
+APPLY_SCENE_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Exclusive(ATTR_ENTITIES, "scene"): {cv.entity_id: SCENE_STATE_SCHEMA},
+            vol.Exclusive(ATTR_SCENE_ID, "scene"): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ENTITIES, ATTR_SCENE_ID),
+)
+
+CAPTURE_SCENE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_SCENE_ID): cv.string,
+    }
+)
+
+# Only frames from this integration are listed in the text summary
+_PROFILE_FILTER = r"custom_components[/\\]haven[/\\]"
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Haven services."""
+    profile_lock = asyncio.Lock()
+
+    async def _async_profile(call: ServiceCall) -> None:
+        if profile_lock.locked():
+            raise HomeAssistantError("A Haven profile is already being recorded")
+        async with profile_lock:
+            await _async_record_profile(hass, call.data[ATTR_DURATION])
+
+    # Scenes captured with a scene_id, kept until Home Assistant restarts
+    scenes: dict[str, dict[str, CommandIntent]] = {}
+
+    async def _async_apply_scene(call: ServiceCall) -> None:
+        if ATTR_SCENE_ID in call.data:
+            scene_id = call.data[ATTR_SCENE_ID]
+            if scene_id not in scenes:
+                raise ServiceValidationError(f"No captured Haven scene named {scene_id}")
+            scene = scenes[scene_id]
+        else:
+            scene = {
+                entity_id: _scene_intent(state)
+                for entity_id, state in call.data[ATTR_ENTITIES].items()
+            }
+        await _async_apply_scene_intents(hass, scene)
+
+    async def _async_capture_scene(call: ServiceCall) -> ServiceResponse:
+        scene = {}
+        for coordinator, lights in _async_resolve_lights(hass, call.data[ATTR_ENTITY_ID]).items():
+            captured = coordinator.location.capture_scene(lights)
+            scene.update(
+                (entity_id, captured[light_id])
+                for light_id, entity_id in lights.items()
+                if light_id in captured
+            )
+        if ATTR_SCENE_ID in call.data:
+            scenes[call.data[ATTR_SCENE_ID]] = scene
+        return {
+            ATTR_ENTITIES: {
+                entity_id: _scene_state(intent) for entity_id, intent in scene.items()
+            }
+        }
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_APPLY_SCENE, _async_apply_scene, schema=APPLY_SCENE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CAPTURE_SCENE,
+        _async_capture_scene,
+        schema=CAPTURE_SCENE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _scene_intent(state: dict[str, Any]) -> CommandIntent:
+    """Target intent of one light of an apply_scene call."""
+    if not state[ATTR_STATE]:
+        return CommandIntent(on=False)
+    intent = turn_on_intent(state)
+    if ATTR_COLOR_ID in state:
+        intent = replace(intent, color=state[ATTR_COLOR_ID])
+    return intent
+
+
+def _scene_state(intent: CommandIntent) -> dict[str, Any]:
+    """A captured intent in the format apply_scene accepts."""
+    if not intent.on:
+        return {ATTR_STATE: STATE_OFF}
+    state: dict[str, Any] = {ATTR_STATE: STATE_ON}
+    if intent.brightness is not None:
+        state[ATTR_BRIGHTNESS] = round(intent.brightness * 25.5)
+    if intent.color is not None:
+        state[ATTR_COLOR_ID] = intent.color
+    return state
+
+
+@callback
+def _async_resolve_lights(
+    hass: HomeAssistant, entity_ids: list[str]
+) -> dict[HavenLocationCoordinator, dict[int, str]]:
+    """Map Haven light entities to their location: light ID -> entity ID."""
+    ent_reg = er.async_get(hass)
+    entries: dict[str, HavenData] = hass.data.get(DOMAIN, {})
+    resolved: dict[HavenLocationCoordinator, dict[int, str]] = {}
+    for entity_id in entity_ids:
+        entry = ent_reg.async_get(entity_id)
+        light_id = light_id_from_unique_id(entry.unique_id) if entry else None
+        data = entries.get(entry.config_entry_id) if entry else None
+        coordinator = data and next(
+            (
+                coordinator
+                for coordinator in data.coordinators.values()
+                if light_id in coordinator.location.lights
+            ),
+            None,
+        )
+        if coordinator is None:
+            raise ServiceValidationError(f"{entity_id} is not a loaded Haven light")
+        resolved.setdefault(coordinator, {})[light_id] = entity_id
+    return resolved
+
+
+async def _async_apply_scene_intents(
+    hass: HomeAssistant, scene: dict[str, CommandIntent]
+) -> None:
+    """Send a scene location by location, then refresh each location once."""
+
+    async def _async_apply_location(
+        coordinator: HavenLocationCoordinator, lights: dict[int, str]
+    ) -> None:
+        targets = {light_id: scene[entity_id] for light_id, entity_id in lights.items()}
+        if not await coordinator.location.async_apply_scene(targets):
+            return
+        await coordinator.async_refresh_confirmation()
+        if coordinator.last_update_success:
+            # Direct commands already updated those lights locally, so the
+            # refresh does not report them; publish all targets together
+            coordinator.async_set_updated_data(coordinator.data | targets.keys())
+
+    await asyncio.gather(
+        *(
+            _async_apply_location(coordinator, lights)
+            for coordinator, lights in _async_resolve_lights(hass, list(scene)).items()
+        )
+    )
+
+
+async def _async_record_profile(hass: HomeAssistant, duration: float) -> None:
+    """Profile the event loop and record Haven spans for ``duration`` seconds."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as err:
+        # Another profiler, e.g. the profiler integration, is running
+        raise HomeAssistantError(f"Unable to start profiling: {err}") from err
+    recorder = start_recording()
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        profiler.disable()
+        stop_recording()
+
+    path = hass.config.path(f"{DOMAIN}.profile.{dt_util.now().strftime('%Y%m%d-%H%M%S')}")
+    await hass.async_add_executor_job(_write_profile, profiler, recorder, path)
+    _LOGGER.info("Haven profile written to %s.{cprof,txt,spans.json}", path)
+
+
+def _write_profile(profiler: cProfile.Profile, recorder: SpanRecorder, path: str) -> None:
+    """Write the raw profile, a summary of the Haven frames and the spans."""
+    profiler.dump_stats(f"{path}.cprof")
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(_PROFILE_FILTER, 50)
+    with open(f"{path}.txt", "w", encoding="utf-8") as file:
+        file.write(summary.getvalue())
+
+    with open(f"{path}.spans.json", "w", encoding="utf-8") as file:
+        json.dump(recorder.as_dict(), file, indent=2)
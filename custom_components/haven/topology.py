@@ -0,0 +1,35 @@
+"""Persisted Haven topology for fast startup."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, TOPOLOGY_STORAGE_VERSION
+
+
+class HavenTopologyStore:
+    """Last discovered locations, zones and groups of a config entry.
+
+    Entities are created from this snapshot at startup, so setup does not
+    wait for the Haven API; discovery reconciles it in the background.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, TOPOLOGY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.topology"
+        )
+
+    async def async_load(self) -> dict[str, dict[str, Any]] | None:
+        """Return the stored snapshot, if any."""
+        return await self._store.async_load()
+
+    async def async_save(self, snapshot: dict[str, dict[str, Any]]) -> None:
+        """Replace the stored snapshot."""
+        await self._store.async_save(snapshot)
+
+    async def async_remove(self) -> None:
+        """Delete the stored snapshot."""
+        await self._store.async_remove()
@@ -0,0 +1,71 @@
+"""Tests for perceptual color matching in havenlighting.colors."""
+from __future__ import annotations
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "haven"))
+
+from havenlighting import colors  # noqa: E402
+
+# Pairs from Sharma, Wu & Dalal, "The CIEDE2000 Color-Difference Formula" (2005)
+SHARMA_PAIRS = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+]
+
+
+@pytest.mark.parametrize("lab1, lab2, expected", SHARMA_PAIRS)
+def test_delta_e_2000_matches_reference(lab1, lab2, expected):
+    assert colors.delta_e_2000(lab1, lab2) == pytest.approx(expected, abs=1e-4)
+    assert colors.delta_e_2000(lab2, lab1) == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.parametrize("rgb, color_id", [
+    ((255, 0, 0), 11),
+    ((128, 0, 0), 11),
+    ((40, 0, 0), 11),
+    ((0, 255, 0), 21),
+    ((0, 90, 0), 21),
+    ((0, 0, 255), 25),
+    ((0, 0, 60), 25),
+    ((255, 255, 0), 18),
+    ((100, 100, 0), 18),
+    ((127, 0, 255), 26),
+    ((60, 0, 120), 26),
+])
+def test_shades_stay_on_their_hue(rgb, color_id):
+    assert colors.closest_color_id(*rgb) == color_id
+
+
+@pytest.mark.parametrize("kelvin, color_id", [
+    (2000, 1),
+    (2700, 1),
+    (2850, 1),
+    (2851, 2),
+    (3250, 2),
+    (3251, 3),
+    (4700, 7),
+    (5000, 8),
+    (9000, 8),
+])
+def test_closest_kelvin_id_bisection_boundaries(kelvin, color_id):
+    assert colors.closest_kelvin_id(kelvin) == color_id
+
+
+def test_lookup_table_matches_direct_match():
+    rng = random.Random(0)
+    half = 1 << (colors._LUT_SHIFT - 1)
+    for _ in range(500):
+        # Cell centers, where the table and a direct match see the same color
+        rgb = [(rng.randrange(colors._LUT_LEVELS) << colors._LUT_SHIFT) + half for _ in range(3)]
+        direct = colors._match_lab(colors.rgb_to_lab(*colors._full_intensity(*rgb)))
+        assert colors.closest_color_id(*rgb) == direct
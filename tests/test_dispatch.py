@@ -0,0 +1,159 @@
+"""Tests for priority dispatch in havenlighting.dispatch."""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "haven"))
+
+from havenlighting.dispatch import Priority, RequestDispatcher  # noqa: E402
+from havenlighting.exceptions import TransientApiError  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _occupy(dispatcher: RequestDispatcher, release: asyncio.Event) -> asyncio.Task:
+    """Take the dispatcher's only slot until ``release`` is set."""
+    async def hold():
+        await release.wait()
+        return "hold"
+
+    task = asyncio.create_task(dispatcher.async_run(Priority.INTERACTIVE, hold))
+    await asyncio.sleep(0)
+    return task
+
+
+def _recorder(order: list, name: str):
+    async def func():
+        order.append(name)
+        return name
+    return func
+
+
+def test_queued_requests_run_by_priority_then_arrival():
+    async def scenario():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        holder = await _occupy(dispatcher, release)
+        order: list = []
+        tasks = []
+        for priority, name in [
+            (Priority.BACKGROUND, "poll1"),
+            (Priority.CONFIRM, "confirm"),
+            (Priority.INTERACTIVE, "command"),
+            (Priority.BACKGROUND, "poll2"),
+        ]:
+            tasks.append(asyncio.create_task(dispatcher.async_run(priority, _recorder(order, name))))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return order, dispatcher
+
+    order, dispatcher = run(scenario())
+    assert order == ["command", "confirm", "poll1", "poll2"]
+    assert (dispatcher.active, dispatcher.queued) == (0, 0)
+
+
+def test_queued_request_is_superseded_by_same_key():
+    async def scenario():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        holder = await _occupy(dispatcher, release)
+        order: list = []
+        older = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder(order, "old"), key="zones")
+        )
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder(order, "new"), key="zones")
+        )
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(holder, older, newer)
+        return order, results, dispatcher
+
+    order, results, dispatcher = run(scenario())
+    assert order == ["new"]
+    assert results == ["hold", "new", "new"]
+    assert (dispatcher.active, dispatcher.queued) == (0, 0)
+
+
+def test_request_granted_a_slot_is_not_superseded():
+    async def scenario():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        holder = await _occupy(dispatcher, release)
+        order: list = []
+        granted = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder(order, "granted"), key="zones")
+        )
+        await asyncio.sleep(0)
+        # Free the slot the way async_run does; the waiter is granted it but
+        # has not resumed when the next request with its key arrives
+        dispatcher._active -= 1
+        dispatcher._grant()
+        later = await dispatcher.async_run(Priority.BACKGROUND, _recorder(order, "later"), key="zones")
+        dispatcher._active += 1
+        release.set()
+        results = await asyncio.gather(holder, granted)
+        return order, later, results, dispatcher
+
+    order, later, results, dispatcher = run(scenario())
+    assert later == "later"
+    assert results == ["hold", "granted"]
+    assert sorted(order) == ["granted", "later"]
+    assert (dispatcher.active, dispatcher.queued) == (0, 0)
+
+
+def test_cancelled_queued_request_frees_its_place():
+    async def scenario():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        holder = await _occupy(dispatcher, release)
+        order: list = []
+        cancelled = asyncio.create_task(
+            dispatcher.async_run(Priority.INTERACTIVE, _recorder(order, "cancelled"))
+        )
+        waiting = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder(order, "waiting"))
+        )
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        results = await asyncio.gather(holder, cancelled, waiting, return_exceptions=True)
+        return order, results, dispatcher
+
+    order, results, dispatcher = run(scenario())
+    assert order == ["waiting"]
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert results[2] == "waiting"
+    assert (dispatcher.active, dispatcher.queued) == (0, 0)
+
+
+def test_cancelled_superseding_request_fails_its_followers():
+    async def scenario():
+        dispatcher = RequestDispatcher(1)
+        release = asyncio.Event()
+        holder = await _occupy(dispatcher, release)
+        older = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder([], "old"), key="zones")
+        )
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(
+            dispatcher.async_run(Priority.BACKGROUND, _recorder([], "new"), key="zones")
+        )
+        await asyncio.sleep(0)
+        newer.cancel()
+        release.set()
+        results = await asyncio.gather(holder, older, newer, return_exceptions=True)
+        return results, dispatcher
+
+    results, dispatcher = run(scenario())
+    assert isinstance(results[1], TransientApiError)
+    assert isinstance(results[2], asyncio.CancelledError)
+    assert (dispatcher.active, dispatcher.queued) == (0, 0)
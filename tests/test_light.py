@@ -0,0 +1,92 @@
+"""Tests for optimistic state and poll ordering in havenlighting.devices.light."""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "haven"))
+
+from havenlighting.commands import CommandIntent  # noqa: E402
+from havenlighting.devices import light as light_module  # noqa: E402
+from havenlighting.devices.light import Light  # noqa: E402
+from havenlighting.models import next_sequence  # noqa: E402
+
+
+def make_light(is_on: bool = False, brightness: int = 5) -> Light:
+    return Light(None, 1, 7, {
+        "id": 7, "name": "Porch", "isZone": True,
+        "isOn": is_on, "lightBrightnessId": brightness,
+    })
+
+
+def test_poll_during_hold_off_is_dropped():
+    light = make_light()
+    before = next_sequence()
+    light.expect(CommandIntent(on=True))
+
+    # Requested before the command, and answered while it is still queued
+    assert not light.update_state(False, 5, None, before)
+    assert not light.update_state(False, 5, None, next_sequence())
+    assert light.is_on
+
+    requested = next_sequence()
+    light.mark_sent()
+    # Requested before the command went out, answered after
+    assert not light.update_state(False, 5, None, requested)
+    assert light.is_on
+
+
+def test_poll_after_mark_sent_confirms_the_command():
+    light = make_light()
+    light.expect(CommandIntent(on=True, brightness=9))
+    light.mark_sent()
+
+    assert not light.update_state(True, 9, None, next_sequence())
+    assert light.is_on and light.data.brightness == 9
+    assert light._expected is None and light._outstanding == 0
+
+
+def test_every_expect_after_mark_sent_is_held():
+    light = make_light()
+    light.expect(CommandIntent(on=True))
+    light.mark_sent()
+    light.expect(CommandIntent(brightness=9))
+
+    # The second command is still queued; the poll must not revert it
+    assert not light.update_state(True, 5, None, next_sequence())
+    assert light.data.brightness == 9
+
+    light.mark_sent()
+    assert not light.update_state(True, 9, None, next_sequence())
+    assert light.data.brightness == 9
+    assert light._outstanding == 0
+
+    # A spurious mark_sent leaves the hold count alone
+    light.mark_sent()
+    assert light._outstanding == 0
+
+
+def test_accepted_revert_logs_a_warning(caplog):
+    light = make_light()
+    light.expect(CommandIntent(on=True))
+    light.mark_sent()
+    # The warning is throttled; another test may have just written it
+    light_module._throttled._throttled.clear()
+
+    with caplog.at_level(logging.WARNING, logger="havenlighting.devices.light"):
+        assert light.update_state(False, 5, None, next_sequence())
+
+    assert not light.is_on
+    assert "did not apply" in caplog.text
+    assert light._expected is None
+
+
+def test_state_snapshots_are_replaced_not_mutated():
+    light = make_light()
+    first = light.data
+    light.expect(CommandIntent(on=True))
+
+    assert light.data is not first
+    assert light.data.seq > first.seq
+    assert first.status == 0